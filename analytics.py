@@ -0,0 +1,233 @@
+"""
+How many comparisons does linear search really need? A Monte Carlo answer.
+
+The story says linear search is fine for 5-12 presents. This module plays
+millions of games at once with NumPy to check it, using the same rules as
+generate_presents:
+    - every present is a random gift from a pool of pool_size gifts
+    - with probability wish_probability (65% in the game), one random
+      present is replaced by the wish
+    - if the wish is also one of the pool's gifts, any present can match
+
+Instead of making every list, each game only draws where the first match
+is: the wish's random position (if Santa brought it) and, when the wish is
+in the pool, the first pool gift that happens to be the wish (a geometric
+random number). Linear search needs (first match + 1) comparisons, or N if
+nothing matches, so a game costs the same for 5 presents or 5 million.
+
+With the wish outside the pool, the theory says a search that finds the
+gift needs (N + 1) / 2 comparisons on average and N at worst, and one that
+doesn't find it always needs N.
+
+Usage:
+    python analytics.py --games 1000000 --min-presents 5 --max-presents 12
+"""
+
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from game_core import OTHER_GIFTS
+
+# Games are simulated this many at a time, so memory stays small even for
+# tens of millions of games
+SIMULATION_BATCH = 1_000_000
+
+# Most list sizes simulated in one run (spread evenly between the minimum
+# and the maximum)
+MAX_SIZES = 12
+
+# Most bars in the comparisons chart
+MAX_BARS = 40
+
+# The simulated games for one list size:
+#   - num_presents: N
+#   - games: how many games had this many presents
+#   - found_rate: fraction of games where the wish was under the tree
+#   - mean_found: average comparisons when the wish was found
+#   - mean_all: average comparisons over all games (found or not)
+#   - worst: most comparisons in any game
+SizeStats = namedtuple(
+    "SizeStats", ["num_presents", "games", "found_rate", "mean_found", "mean_all", "worst"]
+)
+
+# A whole simulation:
+#   - sizes: [SizeStats] for every list size
+#   - comparison_counts: comparison_counts[c] = games that needed c comparisons
+#   - games: total number of games
+#   - seconds: how long the simulation took
+SimulationResult = namedtuple(
+    "SimulationResult", ["sizes", "comparison_counts", "games", "seconds"]
+)
+
+
+def list_sizes(min_presents, max_presents):
+    """
+    Pick up to MAX_SIZES list sizes, evenly spread from min to max presents.
+    """
+    if not 1 <= min_presents <= max_presents:
+        raise ValueError("Need 1 <= min_presents <= max_presents")
+    count = min(MAX_SIZES, max_presents - min_presents + 1)
+    return sorted(set(np.linspace(min_presents, max_presents, count).round().astype(int).tolist()))
+
+
+def first_match_comparisons(rng, games, num_presents, wish_probability, pool_size, wish_in_pool):
+    """
+    Simulate games with one list size and return each game's comparisons.
+
+    Returns:
+        (comparisons, found): two NumPy arrays with one entry per game
+    """
+    # Where Santa put the wish (num_presents = not brought)
+    brought = rng.random(games) < wish_probability
+    first = np.where(brought, rng.integers(0, num_presents, games), num_presents)
+    if wish_in_pool:
+        # The first random pool gift that is the wish: each present is the
+        # wish with probability 1 / pool_size
+        natural = rng.geometric(1 / pool_size, games) - 1
+        np.minimum(first, natural, out=first)
+    found = first < num_presents
+    comparisons = np.where(found, first + 1, num_presents)
+    return comparisons, found
+
+
+def simulate_games(num_games, min_presents=5, max_presents=12, wish_probability=0.65,
+                   pool_size=len(OTHER_GIFTS), wish_in_pool=False, seed=None):
+    """
+    Play many linear search games at once and measure their comparisons.
+
+    The games are split evenly between the list sizes from list_sizes.
+
+    Parameters:
+        num_games (int): How many games to play in total
+        min_presents, max_presents (int): Range of list sizes
+        wish_probability (float): Chance that Santa brings the wish (0.65 in the game)
+        pool_size (int): Number of different gifts Santa picks from
+        wish_in_pool (bool): Whether the wish is one of the pool's gifts
+            (then it can also turn up by chance)
+        seed (int or None): Seed for the random numbers (same seed, same result)
+
+    Returns:
+        SimulationResult
+    """
+    if not 0 <= wish_probability <= 1 or pool_size < 1:
+        raise ValueError("Need 0 <= wish_probability <= 1 and pool_size >= 1")
+    start_time = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    sizes = list_sizes(min_presents, max_presents)
+    comparison_counts = np.zeros(sizes[-1] + 1, dtype=np.int64)
+
+    stats = []
+    for i, num_presents in enumerate(sizes):
+        # Share the games out; the first sizes get the remainder
+        size_games = num_games // len(sizes) + (i < num_games % len(sizes))
+        found_games = found_total = all_total = worst = 0
+        for batch_start in range(0, size_games, SIMULATION_BATCH):
+            batch = min(SIMULATION_BATCH, size_games - batch_start)
+            comparisons, found = first_match_comparisons(
+                rng, batch, num_presents, wish_probability, pool_size, wish_in_pool
+            )
+            comparison_counts[:num_presents + 1] += np.bincount(comparisons, minlength=num_presents + 1)
+            found_games += int(found.sum())
+            found_total += int(comparisons[found].sum())
+            all_total += int(comparisons.sum())
+            worst = max(worst, int(comparisons.max()))
+        stats.append(SizeStats(
+            num_presents, size_games,
+            found_games / size_games if size_games else 0.0,
+            found_total / found_games if found_games else 0.0,
+            all_total / size_games if size_games else 0.0,
+            worst,
+        ))
+
+    return SimulationResult(stats, comparison_counts, num_games, time.perf_counter() - start_time)
+
+
+def comparison_bars(comparison_counts, max_bars=MAX_BARS):
+    """
+    Group the comparison counts into at most max_bars bars for a chart.
+
+    Returns:
+        list[tuple[str, float]]: (label, fraction of games) for every bar,
+        where the label is a comparison count like "7" or a range like "101-200"
+    """
+    total = int(comparison_counts.sum())
+    if total == 0:
+        return []
+    # Every game checks at least one present
+    low = 1
+    high = len(comparison_counts) - 1
+    width = -(-(high - low + 1) // max_bars)
+    bars = []
+    for start in range(low, high + 1, width):
+        end = min(high, start + width - 1)
+        label = str(start) if start == end else f"{start}-{end}"
+        bars.append((label, int(comparison_counts[start:end + 1].sum()) / total))
+    return bars
+
+
+def cost_rows(result):
+    """
+    Simulated and theoretical comparisons for every list size, for a chart.
+
+    Returns:
+        list[tuple[int, str, float]]: (list size, series, comparisons)
+    """
+    rows = []
+    for size in result.sizes:
+        n = size.num_presents
+        rows += [
+            (n, "Simulated mean (found)", size.mean_found),
+            (n, "Theory: (N + 1) / 2", (n + 1) / 2),
+            (n, "Simulated worst", size.worst),
+            (n, "Theory: worst N", n),
+        ]
+    return rows
+
+
+def format_simulation(result, wish_probability):
+    """
+    Describe a simulation as a Markdown table.
+    """
+    lines = [
+        f"Simulated **{result.games:,}** games in **{result.seconds:.2f} s**.\n",
+        "| Presents (N) | Games | Found | Mean comparisons (found) | (N + 1) / 2 "
+        "| Mean comparisons (all games) | Expected (all games) | Worst | N |",
+        "|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for size in result.sizes:
+        n = size.num_presents
+        expected_all = wish_probability * (n + 1) / 2 + (1 - wish_probability) * n
+        lines.append(
+            f"| {n:,} | {size.games:,} | {size.found_rate:.1%} | {size.mean_found:,.2f} "
+            f"| {(n + 1) / 2:,.2f} | {size.mean_all:,.2f} | {expected_all:,.2f} "
+            f"| {size.worst:,} | {n:,} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many linear search games with NumPy.")
+    parser.add_argument("--games", type=int, default=1_000_000, help="games to play (default: 1000000)")
+    parser.add_argument("--min-presents", type=int, default=5, help="smallest list (default: 5)")
+    parser.add_argument("--max-presents", type=int, default=12, help="largest list (default: 12)")
+    parser.add_argument("--wish-probability", type=float, default=0.65,
+                        help="chance Santa brings the wish (default: 0.65)")
+    parser.add_argument("--pool-size", type=int, default=len(OTHER_GIFTS),
+                        help=f"different gifts in Santa's pool (default: {len(OTHER_GIFTS)})")
+    parser.add_argument("--wish-in-pool", action="store_true",
+                        help="the wish is one of the pool's gifts, so it can turn up by chance")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random numbers")
+    args = parser.parse_args()
+
+    result = simulate_games(
+        args.games, args.min_presents, args.max_presents, args.wish_probability,
+        args.pool_size, args.wish_in_pool, args.seed,
+    )
+    print(format_simulation(result, args.wish_probability))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,90 @@
+import asyncio
+import os
 import random
-import gradio as gr
-
-# --------------------------------------
-# Helper: generate presents (unsorted)
-# --------------------------------------
-
-def generate_presents(user_wish: str, num_presents: int):
-    """
-    Create a list of presents under the tree.
-
-    - Each present is a string (gift name).
-    - The list is intentionally UNSORTED.
-    - There is a random chance that Santa includes the user's wish.
-
-    Parameters:
-        user_wish (str): The gift the user asked Santa for.
-        num_presents (int): How many presents are under the tree.
-
-    Returns:
-        presents (list[str]): The unsorted list of gift names.
-    """
-    other_gifts = [
-        "Toy Car",
-        "Book",
-        "Headphones",
-        "Puzzle",
-        "Lego Set",
-        "Board Game",
-        "Stuffed Animal",
-        "Video Game"
-    ]
-
-    presents = []
-
-    # Fill the list with random gifts from the pool.
-    for _ in range(num_presents):
-        random_gift = random.choice(other_gifts)
-        presents.append(random_gift)
-
-    # Randomly decide if Santa brings the user's wish this year.
-    # 65% chance the gift is in the list, 35% chance it's not
-    santa_brings_wish = random.random() < 0.65
-
-    if santa_brings_wish and num_presents > 0:
-        # Replace one random present with the user's wish.
-        wish_index = random.randrange(num_presents)
-        presents[wish_index] = user_wish
-
-    # Shuffle to make the list clearly unsorted.
-    random.shuffle(presents)
-
-    return presents
+import tempfile
+from pathlib import Path
+
+import metrics
+
+# The game logic lives in game_core.py (plain Python, no Gradio).
+# Gradio itself is only imported when the interface is built, so scripts
+# that just want the game logic (like cli.py) start quickly.
+from game_core import (
+    LINEAR_SEARCH,
+    OTHER_GIFTS,
+    SEARCH_ENGINES,
+    TREE_CSS,
+    create_multi_wish_tree,
+    deal_presents,
+    jump_to_step,
+    format_multi_wish_result,
+    multi_wish_search,
+    new_seed,
+    parse_wishes,
+    reset_search,
+    start_search,
+    step_search,
+    wrap_tree,
+)
+# Importing search_engines and parallel_search registers the other search methods
+import parallel_search  # noqa: F401
+from file_search import format_file_result, search_file
+from offload import cancel_session, run_off_loop
+from replay_export import write_replay
+from search_engines import compare_engines, format_engine_table
+from session_store import make_store
+
+# Large-list mode: set SANTA_NUM_PRESENTS (e.g. 1000000) to put that many
+# presents under the tree instead of the usual 5-12. Lists of more than
+# 100 presents are stored compactly as a PresentList (one byte per present).
+LARGE_LIST_PRESENTS = int(os.environ.get("SANTA_NUM_PRESENTS", "0"))
+
+# Server settings for busy classrooms (all optional):
+#   - SANTA_QUEUE_MAX_SIZE: how many requests may wait in the queue before
+#     new ones are turned away (0 = no limit)
+#   - SANTA_CONCURRENCY: how many requests of each event run at once
+#   - SANTA_ADVANCE_CONCURRENCY: same, for the story button (it generates
+#     the presents, which is the slowest handler with large lists)
+#   - SANTA_PLAY_CONCURRENCY: same, for autoplay (0 = no limit; autoplay
+#     waits between steps without holding a worker, so it needs none)
+#   - SANTA_MAX_THREADS: size of the worker thread pool
+QUEUE_MAX_SIZE = int(os.environ.get("SANTA_QUEUE_MAX_SIZE", "200")) or None
+DEFAULT_CONCURRENCY = int(os.environ.get("SANTA_CONCURRENCY", "8"))
+ADVANCE_CONCURRENCY = int(os.environ.get("SANTA_ADVANCE_CONCURRENCY", str(DEFAULT_CONCURRENCY)))
+PLAY_CONCURRENCY = int(os.environ.get("SANTA_PLAY_CONCURRENCY", "0")) or None
+MAX_THREADS = int(os.environ.get("SANTA_MAX_THREADS", "40"))
+
+# Optional server-side store for each player's presents and search (see
+# session_store.py): SANTA_SESSION_STORE=memory or sqlite, with
+# SANTA_SESSION_DB, SANTA_SESSION_TTL (seconds) and SANTA_SESSION_MAX.
+SESSION_STORE = make_store(
+    os.environ.get("SANTA_SESSION_STORE", ""),
+    path=os.environ.get("SANTA_SESSION_DB", "sessions.sqlite3"),
+    max_entries=int(os.environ.get("SANTA_SESSION_MAX", "1000")),
+    ttl=float(os.environ.get("SANTA_SESSION_TTL", "3600")),
+)
+
+# Largest list file that can be uploaded (SANTA_MAX_UPLOAD_MB, in MB)
+MAX_UPLOAD_MB = int(os.environ.get("SANTA_MAX_UPLOAD_MB", "500"))
+
+# Most games one simulation may play (SANTA_MAX_SIMULATED_GAMES)
+MAX_SIMULATED_GAMES = int(os.environ.get("SANTA_MAX_SIMULATED_GAMES", "20000000"))
+
+# Longest list a simulation may use (SANTA_MAX_SIMULATED_PRESENTS). The
+# simulation counts games for every possible number of comparisons, so its
+# memory grows with this (8 bytes per present).
+MAX_SIMULATED_PRESENTS = int(os.environ.get("SANTA_MAX_SIMULATED_PRESENTS", "1000000"))
+
+# Where downloaded replays are written (SANTA_REPLAY_DIR). Each search is
+# written once and named after its trace key, so downloading it again
+# reuses the file. Only the newest SANTA_REPLAY_KEEP replays are kept.
+REPLAY_DIR = Path(os.environ.get("SANTA_REPLAY_DIR", Path(tempfile.gettempdir()) / "santa-replays"))
+REPLAY_KEEP = int(os.environ.get("SANTA_REPLAY_KEEP", "50"))
+
+# Gradio keeps its own copy of every file it sends (like a replay) or
+# receives (like an uploaded list). Copies older than SANTA_CACHE_MAX_AGE
+# seconds are deleted, checked that often.
+CACHE_MAX_AGE = int(os.environ.get("SANTA_CACHE_MAX_AGE", "3600"))
 
 
 # --------------------------------------
@@ -69,7 +103,7 @@ def generate_presents(user_wish: str, num_presents: int):
 #   - search_index_state: current index being checked in linear search (-1 = not started, -2 = finished)
 # --------------------------------------
 
-def advance_story(stage, wish_state, presents_state, wish_input):
+def advance_story(stage, wish_state, presents_state, wish_input, seed=None):
     """
     This function is called every time the user clicks the main button.
     It advances the story depending on the current stage.
@@ -79,6 +113,8 @@ def advance_story(stage, wish_state, presents_state, wish_input):
         wish_state (str): Previously stored wish (from earlier stages).
         presents_state (list): Previously stored presents list.
         wish_input (str): The current text in the wish textbox (user input).
+        seed (int or None): Seed for the presents (None picks a new one).
+            The same seed and wish always put the same presents under the tree.
 
     Returns:
         story_card (Markdown update): Text for the main story card.
@@ -89,6 +125,7 @@ def advance_story(stage, wish_state, presents_state, wish_input):
         new_wish_state (str): Updated stored wish.
         new_presents_state (list): Updated stored presents list.
     """
+    import gradio as gr
 
     # ------- STAGE 1: Ask for the user's wish -------
     if stage == 1:
@@ -155,25 +192,22 @@ def advance_story(stage, wish_state, presents_state, wish_input):
 
     # ------- STAGE 3: Christmas morning + tree + presents -------
     elif stage == 3:
-        # Generate a random number of presents between 5 and 12.
-        num_presents = random.randint(5, 12)
-
-        # Use our helper to create the unsorted list of presents.
-        presents = generate_presents(wish_state, num_presents)
-
-        # Build a visual tree and presents display using HTML/CSS
-        # Create present boxes with indices
-        present_boxes = []
-        for i, gift in enumerate(presents):
-            # Create colored present boxes
-            present_boxes.append(
-                f'<div style="display: inline-block; margin: 5px; padding: 10px; background: linear-gradient(135deg, #ff6b6b, #ee5a6f); border: 2px solid #c92a2a; border-radius: 8px; text-align: center; min-width: 120px; box-shadow: 0 4px 6px rgba(0,0,0,0.2);"><div style="font-size: 24px;">🎁</div><div style="font-weight: bold; color: white; font-size: 12px;">[{i}]</div><div style="color: white; font-size: 11px; margin-top: 5px;">{gift}</div></div>'
-            )
-        
-        presents_html = ''.join(present_boxes)
-        
-        # Create the tree visual with HTML/CSS (single line to avoid formatting issues)
-        tree_view = f'<div style="text-align: center; padding: 20px; background: linear-gradient(to bottom, #87CEEB 0%, #E0F6FF 100%); border-radius: 10px; margin: 20px 0;"><h3 style="color: #2d5016; margin-bottom: 20px;">🎄 Christmas Morning!</h3><p style="color: #333; margin-bottom: 20px;">You run to the living room and see the Christmas tree...</p><div style="margin: 20px auto; display: inline-block;"><div style="color: #2d5016; font-size: 60px; line-height: 1; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">🎄</div></div><div style="margin-top: 30px;"><p style="font-weight: bold; color: #2d5016; margin-bottom: 15px; font-size: 16px;">Presents under the tree (unsorted):</p><div style="display: flex; flex-wrap: wrap; justify-content: center; align-items: center;">{presents_html}</div></div></div>'
+        # Only a seed from the page address is likely to be dealt again
+        seed_given = seed is not None
+        if seed is None:
+            seed = new_seed()
+
+        if LARGE_LIST_PRESENTS:
+            # Large-list mode: a fixed number of presents.
+            num_presents = LARGE_LIST_PRESENTS
+        else:
+            # A random number of presents between 5 and 12 (picked by the seed too).
+            num_presents = random.Random(seed).randint(5, 12)
+
+        # Create the unsorted list of presents and draw it (nothing checked
+        # yet). Recent trees asked for by seed come from a cache.
+        presents, presents_html = deal_presents(seed, num_presents, wish_state, cache=seed_given)
+        tree_view = wrap_tree(presents_html)
 
         story_text = (
             "### 🎄 It's Christmas morning!\n\n"
@@ -184,7 +218,8 @@ def advance_story(stage, wish_state, presents_state, wish_input):
             "1. The number of gifts in an average household is not that many, usually a small number like 5-12.\n"
             "2. The gifts are **unsorted**.\n\n"
             "These are two reasons why linear searching is perfect!\n\n"
-            "Click **`Start searching`** to begin the linear search!"
+            "Click **`Start searching`** to begin the linear search!\n\n"
+            f"_Tree number {seed}: add `?seed={seed}` to the page address to get these presents again._"
         )
 
         wish_box = gr.update(visible=False)
@@ -208,351 +243,731 @@ def advance_story(stage, wish_state, presents_state, wish_input):
     return story_text, wish_box, button, tree_md, 1, "", []
 
 
-# --------------------------------------
-# Linear Search Functions
-# --------------------------------------
-
-def create_tree_with_search(presents, wish, current_index, found_index):
+def seed_from_url(request):
     """
-    Create the visual tree display with highlighted current gift being checked.
-    
+    Read the seed from the page address (e.g. ...?seed=42), if there is one.
+
     Parameters:
-        presents (list): List of gift names
-        wish (str): The gift we're searching for
-        current_index (int): Current index being checked (-1 if not started, -2 if finished)
-        found_index (int): Index where gift was found (-1 if not found)
-    
+        request (gr.Request or None): The request that clicked the button.
+
     Returns:
-        str: HTML string for the tree and presents display
+        int or None: The seed, or None if the address has no valid seed.
     """
-    present_boxes = []
-    for i, gift in enumerate(presents):
-        # Determine the styling based on search state
-        if found_index != -1 and i == found_index:
-            # Gift found - highlight in green
-            bg_color = "linear-gradient(135deg, #51cf66, #40c057)"
-            border_color = "#2f9e44"
-            status = "✓ FOUND!"
-        elif current_index == i:
-            # Currently checking this gift - highlight in yellow
-            bg_color = "linear-gradient(135deg, #ffd43b, #fcc419)"
-            border_color = "#f59f00"
-            status = "Checking..."
-        elif current_index != -1 and current_index != -2 and i < current_index:
-            # Already checked - gray out
-            bg_color = "linear-gradient(135deg, #868e96, #495057)"
-            border_color = "#343a40"
-            status = "Checked"
-        else:
-            # Not yet checked
-            bg_color = "linear-gradient(135deg, #ff6b6b, #ee5a6f)"
-            border_color = "#c92a2a"
-            status = ""
-        
-        present_boxes.append(
-            f'<div style="display: inline-block; margin: 5px; padding: 10px; background: {bg_color}; border: 3px solid {border_color}; border-radius: 8px; text-align: center; min-width: 120px; box-shadow: 0 4px 6px rgba(0,0,0,0.2);"><div style="font-size: 24px;">🎁</div><div style="font-weight: bold; color: white; font-size: 12px;">[{i}]</div><div style="color: white; font-size: 11px; margin-top: 5px;">{gift}</div><div style="color: white; font-size: 10px; margin-top: 3px; font-weight: bold;">{status}</div></div>'
-        )
-    
-    presents_html = ''.join(present_boxes)
-    
-    tree_view = f'<div style="text-align: center; padding: 20px; background: linear-gradient(to bottom, #87CEEB 0%, #E0F6FF 100%); border-radius: 10px; margin: 20px 0;"><h3 style="color: #2d5016; margin-bottom: 20px;">🎄 Christmas Morning!</h3><p style="color: #333; margin-bottom: 20px;">You run to the living room and see the Christmas tree...</p><div style="margin: 20px auto; display: inline-block;"><div style="color: #2d5016; font-size: 60px; line-height: 1; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">🎄</div></div><div style="margin-top: 30px;"><p style="font-weight: bold; color: #2d5016; margin-bottom: 15px; font-size: 16px;">Presents under the tree (unsorted):</p><div style="display: flex; flex-wrap: wrap; justify-content: center; align-items: center;">{presents_html}</div></div></div>'
-    
-    return tree_view
+    if request is None:
+        return None
+    try:
+        return int(request.query_params["seed"])
+    except (KeyError, ValueError):
+        return None
 
 
-def step_search(stage, wish_state, presents_state, search_index):
+def keep(request, name, value):
     """
-    Advance the linear search by one step.
-    
+    Put game data in the session store (if there is one).
+
     Parameters:
-        stage (int): Current stage (should be 4)
-        wish_state (str): The gift we're searching for
-        presents_state (list): List of presents
-        search_index (int): Current index being checked
-    
+        request (gr.Request or None): The request, for its session id.
+        name (str): What the value is, e.g. "presents".
+        value: The presents or search trace.
+
     Returns:
-        Updated UI components and search state
+        What gr.State should hold: a short key when the value went into
+        the store, otherwise the value itself.
     """
-    if stage != 4 or not presents_state:
-        return None, None, None
-    
-    # Initialize search if not started
-    if search_index == -1:
-        search_index = 0
-    
-    # Check if we've already finished
-    if search_index == -2:
-        return None, None, -2
-    
-    # Check if current gift matches (case-insensitive comparison)
-    found_index = -1
-    if search_index < len(presents_state):
-        if presents_state[search_index].lower() == wish_state.lower():
-            found_index = search_index
-    
-    # Update the visual display
-    tree_html = create_tree_with_search(presents_state, wish_state, search_index, found_index)
-    
-    # Create status message
-    if found_index != -1:
-        # Found it!
-        status_text = (
-            f"### 🎉 Found it!\n\n"
-            f"After using linear search to check the presents, "
-            f"we see that you are on the **nice list** and Santa brought your gift, hurray!\n\n"
-            f"**{wish_state}** was found at position [{found_index}]!\n\n"
-            f"**Linear search found your gift after checking {search_index + 1} present(s).**"
-        )
-        new_search_index = -2  # Mark as finished
-        button_text = "Play again"  # Change button to "Play again"
-    elif search_index >= len(presents_state) - 1:
-        # Reached the end, not found
-        status_text = (
-            f"### 😔 Not found\n\n"
-            f"After using linear search and iterating through the entire list of presents, "
-            f"we see that you are on the **naughty list** and Santa didn't bring your gift.\n\n"
-            f"We checked all {len(presents_state)} presents, but **{wish_state}** wasn't there.\n\n"
-            f"**Linear search checked all {len(presents_state)} presents.**"
-        )
-        new_search_index = -2  # Mark as finished
-        button_text = "Play again"  # Change button to "Play again"
-    else:
-        # Still searching
-        current_gift = presents_state[search_index]
-        is_match = current_gift.lower() == wish_state.lower()
-        match_text = "✓ It's a match!" if is_match else "✗ Not a match"
-        
-        status_text = (
-            f"### 🔍 Checking present [{search_index}]...\n\n"
-            f"Current gift: **{current_gift}**\n"
-            f"Looking for: **{wish_state}**\n"
-            f"Result: {match_text}\n\n"
-            f"**Progress:** Checked {search_index + 1} of {len(presents_state)} presents"
-        )
-        new_search_index = search_index + 1
-        button_text = "Step"  # Keep button as "Step"
-    
-    return status_text, tree_html, new_search_index, button_text
+    if SESSION_STORE is None or request is None or not value or isinstance(value, str):
+        return value
+    key = f"{request.session_hash}:{name}"
+    SESSION_STORE.put(key, value)
+    return key
 
 
-def reset_search(stage, wish_state, presents_state):
+def fetch(value):
     """
-    Reset the search to the beginning.
-    
-    Parameters:
-        stage (int): Current stage
-        wish_state (str): The gift we're searching for
-        presents_state (list): List of presents
-    
+    Get game data back from the session store (see keep).
+
     Returns:
-        Updated UI components with search reset
+        The stored value, None if it expired, or value itself if it isn't a key.
     """
-    if stage != 4 or not presents_state:
-        return None, None, None
-    
-    # Reset to start of search
-    tree_html = create_tree_with_search(presents_state, wish_state, -1, -1)
-    
-    status_text = (
-        f"### 🔍 Ready to search!\n\n"
-        f"Let's use **linear search** to find **{wish_state}**.\n\n"
-        f"Click **Step** to check each present one by one, starting from position [0].\n\n"
-        f"**Total presents to check:** {len(presents_state)}"
-    )
-    
-    return status_text, tree_html, -1
-
-
-def start_search(stage, wish_state, presents_state):
+    if SESSION_STORE is not None and isinstance(value, str):
+        return SESSION_STORE.get(value)
+    return value
+
+
+# Shown on the story card when a click took longer than SANTA_HANDLER_TIMEOUT
+BUSY_TEXT = ("### ⏳ Santa's helpers are busy\n\n"
+             "That took too long, so nothing changed. Please try again in a moment.")
+
+# Fastest autoplay speed, in presents checked per second
+MAX_AUTOPLAY_SPEED = 10
+
+# Browser-side code that applies a patch from step_search: either swap
+# the changed boxes (found by their "present-<index>" id) in place, or, for
+# long lists drawn as a window, swap in the whole redrawn tree.
+APPLY_TREE_PATCH_JS = """
+(patch) => {
+    if (!patch) return;
+    if (patch.tree) {
+        const tree = document.querySelector("#tree-display .santa-tree");
+        if (tree) tree.outerHTML = patch.tree;
+        return;
+    }
+    if (!patch.boxes) return;
+    for (const [index, html] of Object.entries(patch.boxes)) {
+        const box = document.querySelector("#tree-display #present-" + index);
+        if (box) box.outerHTML = html;
+    }
+}
+"""
+
+
+def prune_replays(keep=REPLAY_KEEP, startup=False):
     """
-    Transition from stage 3 to stage 4 (start the search).
-    
+    Delete all but the newest saved replays in REPLAY_DIR.
+
     Parameters:
-        stage (int): Current stage (should be 3)
-        wish_state (str): The gift we're searching for
-        presents_state (list): List of presents
-    
+        keep (int): How many replays to keep
+        startup (bool): Also remove half-written replays left behind when
+            the server stopped (while it runs, they may still be in use)
+
     Returns:
-        Updated UI components to start search: (status_text, tree_html, new_stage, search_index)
+        int: How many files were deleted
     """
-    if stage != 3 or not presents_state or len(presents_state) == 0:
-        return None
-    
-    # Initialize search - create tree with all presents visible (not checked yet)
-    tree_html = create_tree_with_search(presents_state, wish_state, -1, -1)
-    
-    status_text = (
-        f"### 🔍 Ready to search!\n\n"
-        f"Let's use **linear search** to find **{wish_state}**.\n\n"
-        f"**Linear search is great to use here** because:\n"
-        f"- The list of gifts is **small**. On average, families in Canada only have 5-12 gifts under their Christmas tree.\n"
-        f"- The gifts are **unsorted**.\n\n"
-        f"Click **Step** to check each present one by one, starting from position [0].\n\n"
-        f"**Total presents to check:** {len(presents_state)}"
-    )
-    
-    return (status_text, tree_html, 4, -1)
+    replays = []
+    for path in REPLAY_DIR.glob("replay-*.html"):
+        try:
+            replays.append((path.stat().st_mtime, path))
+        except OSError:
+            # Deleted by another session in the meantime
+            continue
+    replays.sort(reverse=True)
+    old = [path for _, path in replays[keep:]]
+    if startup:
+        old += REPLAY_DIR.glob("replay-*.partial")
+    for path in old:
+        path.unlink(missing_ok=True)
+    return len(old)
 
 
 # --------------------------------------
 # Build the Gradio interface
 # --------------------------------------
 
-with gr.Blocks() as demo:
-    gr.Markdown("## 🎄 Christmas Linear Search Game")
-
-    # Main story "card"
-    story_card = gr.Markdown(
-        "**Welcome to my Christmas linear search game!** You are a kid on the night before Christmas.\n\n"
-        "### 🎁 What gift do you want Santa to bring you this Christmas?\n\n"
-        "Type the name of a gift below (for example: **Basketball**, **Lego Set**, or **Headphones**),\n"
-        "then click **`Save my wish`**.",
-        elem_id="story-card"
-    )
+def build_demo():
+    """
+    Build the Gradio interface for the game.
 
-    # Textbox for the user's wish (visible by default, will be hidden/shown as needed)
-    wish_input = gr.Textbox(
-        label="What gift do you want Santa to bring you this Christmas?",
-        placeholder="e.g., Basketball",
-        visible=True
-    )
+    Returns:
+        demo (gr.Blocks): The app, ready to launch.
+    """
+    import gradio as gr
 
-    # Area to show the tree + presents later (using HTML for visual styling)
-    tree_display = gr.HTML(
-        ""
-    )
+    # Clear out replays left over from earlier runs
+    prune_replays(startup=True)
 
-    # Main button that advances the story
-    advance_button = gr.Button("Save my wish")
-
-    # Search control buttons (initially hidden)
-    with gr.Row(visible=False) as search_controls:
-        step_button = gr.Button("Step", variant="primary")
-        reset_button = gr.Button("Reset", variant="secondary")
-
-    # Hidden state variables to keep track of the story progress and data
-    stage_state = gr.State(1)     # start at stage 1 (wish input)
-    wish_state = gr.State("")     # will store the user's wish
-    presents_state = gr.State([]) # will store the presents list
-    search_index_state = gr.State(-1)  # current search index (-1 = not started, -2 = finished)
-
-    # When the main button is clicked, we call advance_story(...)
-    def handle_advance(stage, wish, presents, wish_in):
-        """Handle the main advance button click."""
-        result = advance_story(stage, wish, presents, wish_in)
-        new_stage = result[4]
-        
-        # If we're in stage 3 and clicking "Start searching", transition to stage 4
-        if stage == 3 and new_stage == 3:
-            # User clicked "Start searching" - transition to search mode
-            search_result = start_search(3, wish, presents)
-            if search_result is not None and len(search_result) == 4:
-                status_text, tree_html, new_stage_val, search_idx = search_result
-                return (
-                    status_text,  # story_card (status text)
-                    result[1],  # wish_input
-                    gr.update(visible=False),  # hide advance button
-                    tree_html,  # tree_display (tree with presents)
-                    new_stage_val,  # stage_state (4)
-                    wish,  # wish_state
-                    presents,  # presents_state
-                    gr.update(visible=True),  # show search controls
-                    search_idx  # search_index_state (-1)
-                )
-        
-        # For other stages, hide search controls
-        show_controls = (new_stage == 4)
-        return (
-            result[0],  # story_card
-            result[1],  # wish_input
-            result[2],  # advance_button
-            result[3],  # tree_display
-            result[4],  # stage_state
-            result[5],  # wish_state
-            result[6],  # presents_state
-            gr.update(visible=show_controls),  # show/hide search controls
-            -1  # search_index_state
-        )
-    
-    advance_button.click(
-        fn=handle_advance,
-        inputs=[stage_state, wish_state, presents_state, wish_input],
-        outputs=[story_card, wish_input, advance_button, tree_display,
-                 stage_state, wish_state, presents_state, search_controls, search_index_state]
-    )
+    with gr.Blocks(delete_cache=(CACHE_MAX_AGE, CACHE_MAX_AGE)) as demo:
+        gr.Markdown("## 🎄 Christmas Linear Search Game")
 
-    # Function to restart the game from the beginning
-    def restart_game():
-        """Reset the game to the initial state."""
-        initial_story = (
-            "**Welcome to my Christmas linear search game!** You are a kid on the night before giftmas.\n\n"
+        # Main story "card"
+        story_card = gr.Markdown(
+            "**Welcome to my Christmas linear search game!** You are a kid on the night before Christmas.\n\n"
             "### 🎁 What gift do you want Santa to bring you this Christmas?\n\n"
             "Type the name of a gift below (for example: **Basketball**, **Lego Set**, or **Headphones**),\n"
-            "then click **`Save my wish`**."
+            "then click **`Save my wish`**.",
+            elem_id="story-card"
         )
-        return (
-            initial_story,  # story_card
-            gr.update(visible=True, value=""),  # wish_input (show and clear)
-            gr.update(value="Save my wish", visible=True),  # advance_button (show and set text)
-            gr.update(value=""),  # tree_display (clear)
-            1,  # stage_state (back to stage 1)
-            "",  # wish_state (clear)
-            [],  # presents_state (clear)
-            gr.update(visible=False),  # search_controls (hide)
-            -1,  # search_index_state (reset)
-            gr.update(value="Step")  # step_button (reset to "Step")
+
+        # Textbox for the user's wish (visible by default, will be hidden/shown as needed)
+        wish_input = gr.Textbox(
+            label="What gift do you want Santa to bring you this Christmas?",
+            placeholder="e.g., Basketball",
+            visible=True
         )
-    
-    # Step button - advance search by one step, or restart if search is finished
-    def handle_step(stage, wish, presents, search_idx):
-        """Handle step button click."""
-        # If search is finished (search_idx == -2), restart the game
-        if search_idx == -2:
-            return restart_game()
-        
-        # Otherwise, continue with search
-        if stage != 4:
-            return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+
+        # Area to show the tree + presents later (using HTML for visual styling)
+        # TREE_CSS is attached to the components that draw present boxes
+        # (not to launch()), so the boxes are styled however the app is started
+        tree_display = gr.HTML(
+            "", elem_id="tree-display", css_template=TREE_CSS
+        )
+
+        # Carries the small per-step patches from step_search to the browser,
+        # which applies them to tree_display without re-sending the whole tree.
+        tree_patch = gr.JSON(visible="hidden")
+        tree_patch.change(fn=None, inputs=tree_patch, js=APPLY_TREE_PATCH_JS)
+
+        # Main button that advances the story
+        advance_button = gr.Button("Save my wish")
+
+        # Search control buttons (initially hidden)
+        with gr.Row(visible=False) as search_controls:
+            step_button = gr.Button("Step", variant="primary")
+            reset_button = gr.Button("Reset", variant="secondary")
+            play_button = gr.Button("▶ Play", variant="secondary")
+            pause_button = gr.Button("⏸ Pause", variant="secondary")
+            speed_slider = gr.Slider(
+                minimum=1, maximum=MAX_AUTOPLAY_SPEED, value=2, step=1,
+                label="Speed (presents per second)"
+            )
+            engine_dropdown = gr.Dropdown(
+                choices=list(SEARCH_ENGINES), value=LINEAR_SEARCH, label="Search method"
+            )
+            compare_button = gr.Button("Compare search methods", variant="secondary")
+            replay_button = gr.Button("Save replay", variant="secondary")
+            # Drag to see the search after any number of steps (forwards or back)
+            jump_slider = gr.Slider(
+                minimum=0, maximum=1, value=0, step=1, label="Jump to step (presents checked)"
+            )
+
+        # Measured cost of every search method on this list (filled in by compare_button)
+        engine_stats = gr.Markdown("")
+
+        # The saved replay: a web page that plays the search without the server
+        replay_file = gr.File(label="Replay (open it in any browser)", visible=False)
+
+        # Search the presents under the tree for several gifts in one pass
+        with gr.Accordion("Search for several gifts at once", open=False):
+            wishes_input = gr.Textbox(label="Gifts to search for",
+                                      placeholder="e.g., Bike, Lego Set, Book")
+            multi_wish_button = gr.Button("Find them all in one pass", variant="secondary")
+            multi_wish_result = gr.Markdown("")
+            multi_wish_tree = gr.HTML("", css_template=TREE_CSS)
+
+        # Search your own list of presents (a text or CSV file)
+        with gr.Accordion("Bring your own list", open=False):
+            gr.Markdown(
+                "Upload a text file with one present per line, or a CSV file with the present "
+                "in the first column. Linear search checks it line by line without loading "
+                "the whole file, so it can be very large."
+            )
+            list_file = gr.File(label="List of presents", file_types=[".txt", ".csv"],
+                                type="filepath")
+            file_wish = gr.Textbox(label="Gift to search for",
+                                   placeholder="Leave empty to use your wish")
+            file_search_button = gr.Button("Search my list", variant="secondary")
+            file_result = gr.Markdown("")
+
+        # Simulate millions of games to see how many comparisons linear search needs
+        with gr.Accordion("How many comparisons? (simulation)", open=False):
+            gr.Markdown(
+                "Play many games at once with the game's rules and compare the comparisons "
+                "linear search needed with the theory: **(N + 1) / 2** on average when the gift "
+                "is found, and **N** at worst."
+            )
+            with gr.Row():
+                sim_games = gr.Number(value=1_000_000, precision=0, label="Games",
+                                      minimum=1, maximum=MAX_SIMULATED_GAMES)
+                sim_min_presents = gr.Number(value=5, precision=0, minimum=1,
+                                             maximum=MAX_SIMULATED_PRESENTS, label="Fewest presents")
+                sim_max_presents = gr.Number(value=12, precision=0, minimum=1,
+                                             maximum=MAX_SIMULATED_PRESENTS, label="Most presents")
+            with gr.Row():
+                sim_wish_probability = gr.Slider(minimum=0, maximum=1, value=0.65, step=0.05,
+                                                 label="Chance Santa brings the wish")
+                sim_pool_size = gr.Slider(minimum=1, maximum=50, value=len(OTHER_GIFTS), step=1,
+                                          label="Different gifts in Santa's pool")
+                sim_wish_in_pool = gr.Checkbox(value=False, label="The wish is one of the pool's gifts")
+            simulate_button = gr.Button("Simulate", variant="secondary")
+            sim_result = gr.Markdown("")
+            sim_cost_plot = gr.LinePlot(x="presents", y="comparisons", color="series",
+                                        title="Comparisons by list size", visible=False)
+            sim_distribution_plot = gr.BarPlot(x="comparisons", y="share of games",
+                                               title="How many comparisons each game needed",
+                                               visible=False)
+
+        # Hidden state variables to keep track of the story progress and data
+        stage_state = gr.State(1)     # start at stage 1 (wish input)
+        wish_state = gr.State("")     # will store the user's wish
+        presents_state = gr.State([]) # will store the presents list (or its key, see keep)
+        search_index_state = gr.State(-1)  # current search index (-1 = not started, -2 = finished)
+        trace_state = gr.State(None)  # the precomputed search (SearchTrace, or its key) once searching starts
+
+        async def off_loop(request, name, pool, num_outputs, work, *args):
+            """
+            Run work(*args) in a thread pool without blocking the event loop.
+
+            name is the handler's name, for the profiles saved while the work
+            runs (see SANTA_PROFILE_SAMPLE_RATE). If it takes longer than
+            SANTA_HANDLER_TIMEOUT, the story card says so and nothing else
+            changes.
+            """
+            session_id = request.session_hash if request is not None else None
+            try:
+                return await run_off_loop(session_id, pool, work, *args, name=name)
+            except TimeoutError:
+                return (BUSY_TEXT,) + (gr.update(),) * (num_outputs - 1)
+
+        def jump_update(trace):
+            """Set the jump slider up for a new search: one position per step, back at 0."""
+            return gr.update(maximum=max(1, trace.comparisons), value=0)
+
+        # When the main button is clicked, we call advance_story(...)
+        def advance_game(stage, wish, presents, wish_in, engine, request: gr.Request = None):
+            """Handle the main advance button click."""
+            presents_key, presents = presents, fetch(presents)
+            # If we're in stage 3 with presents under the tree, "Start searching"
+            # was clicked: transition to stage 4 with the same presents.
+            if stage == 3 and presents:
+                try:
+                    search_result = start_search(3, wish, presents, engine)
+                except ValueError:
+                    # The chosen method can't search this list (it is computed
+                    # on demand, see VirtualPresents), so start with linear search
+                    engine = LINEAR_SEARCH
+                    search_result = start_search(3, wish, presents, engine)
+                if search_result is not None and len(search_result) == 5:
+                    status_text, tree_html, new_stage_val, search_idx, trace = search_result
+                    metrics.record_search(trace)
+                    return (
+                        status_text,  # story_card (status text)
+                        gr.update(visible=False),  # wish_input
+                        gr.update(visible=False),  # hide advance button
+                        tree_html,  # tree_display (tree with presents)
+                        new_stage_val,  # stage_state (4)
+                        wish,  # wish_state
+                        presents_key,  # presents_state
+                        gr.update(visible=True),  # show search controls
+                        search_idx,  # search_index_state (-1)
+                        keep(request, "trace", trace),  # trace_state (the precomputed search)
+                        jump_update(trace),  # jump_slider (one position per step)
+                        gr.update(value=engine)  # engine_dropdown (the method really used)
+                    )
+
+            result = advance_story(stage, wish, presents, wish_in, seed_from_url(request))
+            new_stage = result[4]
         
-        result = step_search(stage, wish, presents, search_idx)
-        if result and len(result) >= 4:
+            # For other stages, hide search controls
+            show_controls = (new_stage == 4)
             return (
                 result[0],  # story_card
-                gr.update(),  # wish_input (no change)
-                gr.update(),  # advance_button (no change)
-                result[1],  # tree_display
-                gr.update(),  # stage_state (no change)
-                gr.update(),  # wish_state (no change)
-                gr.update(),  # presents_state (no change)
-                gr.update(),  # search_controls (no change)
-                result[2],  # search_index_state
-                gr.update(value=result[3])  # step_button (update text to "Play again" if finished)
+                result[1],  # wish_input
+                result[2],  # advance_button
+                result[3],  # tree_display
+                result[4],  # stage_state
+                result[5],  # wish_state
+                keep(request, "presents", result[6]),  # presents_state
+                gr.update(visible=show_controls),  # show/hide search controls
+                -1,  # search_index_state
+                None,  # trace_state (no search yet)
+                gr.update(),  # jump_slider (no change)
+                gr.update()  # engine_dropdown (no change)
             )
-        return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
     
-    step_button.click(
-        fn=handle_step,
-        inputs=[stage_state, wish_state, presents_state, search_index_state],
-        outputs=[story_card, wish_input, advance_button, tree_display,
-                 stage_state, wish_state, presents_state, search_controls, search_index_state, step_button]
-    )
+        @metrics.instrument("handle_advance")
+        async def handle_advance(stage, wish, presents, wish_in, engine, request: gr.Request = None):
+            """Deal the presents or start the search in the heavy pool (see offload.py)."""
+            return await off_loop(request, "handle_advance", "heavy", 12, advance_game,
+                                  stage, wish, presents, wish_in, engine, request)
+
+        advance_button.click(
+            fn=handle_advance,
+            inputs=[stage_state, wish_state, presents_state, wish_input, engine_dropdown],
+            outputs=[story_card, wish_input, advance_button, tree_display,
+                     stage_state, wish_state, presents_state, search_controls, search_index_state,
+                     trace_state, jump_slider, engine_dropdown],
+            concurrency_limit=ADVANCE_CONCURRENCY
+        )
 
-    # Reset button - reset search to beginning
-    def handle_reset(stage, wish, presents):
-        """Handle reset button click."""
-        if stage != 4:
-            return None, None, None
-        result = reset_search(stage, wish, presents)
-        if result:
-            return result[0], result[1], result[2]  # story_card, tree_display, search_index_state
-        return None, None, None
+        # Function to restart the game from the beginning
+        def restart_game():
+            """Reset the game to the initial state."""
+            initial_story = (
+                "**Welcome to my Christmas linear search game!** You are a kid on the night before giftmas.\n\n"
+                "### 🎁 What gift do you want Santa to bring you this Christmas?\n\n"
+                "Type the name of a gift below (for example: **Basketball**, **Lego Set**, or **Headphones**),\n"
+                "then click **`Save my wish`**."
+            )
+            return (
+                initial_story,  # story_card
+                gr.update(visible=True, value=""),  # wish_input (show and clear)
+                gr.update(value="Save my wish", visible=True),  # advance_button (show and set text)
+                gr.update(value=""),  # tree_display (clear)
+                1,  # stage_state (back to stage 1)
+                "",  # wish_state (clear)
+                [],  # presents_state (clear)
+                gr.update(visible=False),  # search_controls (hide)
+                -1,  # search_index_state (reset)
+                gr.update(value="Step"),  # step_button (reset to "Step")
+                gr.update()  # tree_patch (no change)
+            )
     
-    reset_button.click(
-        fn=handle_reset,
-        inputs=[stage_state, wish_state, presents_state],
-        outputs=[story_card, tree_display, search_index_state]
-    )
+        # Step button - advance search by one step, or restart if search is finished
+        def step_game(stage, trace, presents, search_idx):
+            """Handle step button click."""
+            trace, presents = fetch(trace), fetch(presents)
+            # If search is finished (search_idx == -2), restart the game
+            if search_idx == -2:
+                return restart_game()
+        
+            # The game was dropped from the session store (unused for too long)
+            if stage == 4 and (trace is None or not presents):
+                return restart_game()
+
+            # Otherwise, continue with search
+            if stage != 4:
+                return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+        
+            result = step_search(stage, trace, presents, search_idx)
+            if result and len(result) >= 4:
+                return (
+                    result[0],  # story_card
+                    gr.update(),  # wish_input (no change)
+                    gr.update(),  # advance_button (no change)
+                    gr.update(),  # tree_display (no change, patched in the browser instead)
+                    gr.update(),  # stage_state (no change)
+                    gr.update(),  # wish_state (no change)
+                    gr.update(),  # presents_state (no change)
+                    gr.update(),  # search_controls (no change)
+                    result[2],  # search_index_state
+                    gr.update(value=result[3]),  # step_button (update text to "Play again" if finished)
+                    result[1]  # tree_patch (only the boxes that changed)
+                )
+            return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+    
+        @metrics.instrument("handle_step")
+        async def handle_step(stage, trace, presents, search_idx, request: gr.Request = None):
+            """Step in the fast pool, so it never waits behind a big search (see offload.py)."""
+            return await off_loop(request, "handle_step", "fast", 11, step_game,
+                                  stage, trace, presents, search_idx)
+
+        step_button.click(
+            fn=handle_step,
+            inputs=[stage_state, trace_state, presents_state, search_index_state],
+            outputs=[story_card, wish_input, advance_button, tree_display,
+                     stage_state, wish_state, presents_state, search_controls, search_index_state, step_button,
+                     tree_patch]
+        )
+
+        # Reset button - reset search to beginning
+        def reset_game(stage, trace, presents):
+            """Handle reset button click."""
+            trace, presents = fetch(trace), fetch(presents)
+            if stage != 4:
+                return None, None, None, gr.update()
+            result = reset_search(stage, trace, presents)
+            if result:
+                # story_card, tree_display, search_index_state, jump_slider
+                return result[0], result[1], result[2], gr.update(value=0)
+            return None, None, None, gr.update()
+    
+        @metrics.instrument("handle_reset")
+        async def handle_reset(stage, trace, presents, request: gr.Request = None):
+            """Reset in the fast pool (see offload.py)."""
+            return await off_loop(request, "handle_reset", "fast", 4, reset_game, stage, trace, presents)
+
+        def fetch_game(trace, presents):
+            """Get the search and presents back from the session store (if any)."""
+            return fetch(trace), fetch(presents)
+
+        # Play button - run the rest of the search automatically.
+        # This is an async generator: one click streams every step to the
+        # browser, instead of one request per Step click. It waits between
+        # steps with asyncio.sleep, so a long autoplay holds no worker
+        # thread; each step is drawn in the fast pool like a Step click.
+        @metrics.instrument("handle_play")
+        async def handle_play(stage, trace, presents, search_idx, speed, request: gr.Request = None):
+            """Handle play button click (autoplay the search)."""
+            session_id = request.session_hash if request is not None else None
+            try:
+                trace, presents = await run_off_loop(session_id, "fast", fetch_game, trace, presents,
+                                                     name="handle_play")
+                if stage != 4 or search_idx == -2:
+                    yield gr.update(), gr.update(), gr.update(), gr.update()
+                    return
+
+                delay = 1.0 / max(1, min(speed or 1, MAX_AUTOPLAY_SPEED))
+                while search_idx != -2:
+                    result = await run_off_loop(
+                        session_id, "fast", step_search, stage, trace, presents, search_idx,
+                        name="handle_play"
+                    )
+                    if not result or len(result) < 4:
+                        return
+                    status_text, patch, search_idx, button_text = result
+                    # search_index_state is updated on every frame, so Pause keeps
+                    # our place and Play carries on from there.
+                    yield status_text, patch, search_idx, gr.update(value=button_text)
+                    if search_idx != -2:
+                        await asyncio.sleep(delay)
+            except TimeoutError:
+                yield BUSY_TEXT, gr.update(), gr.update(), gr.update()
+
+        play_event = play_button.click(
+            fn=handle_play,
+            inputs=[stage_state, trace_state, presents_state, search_index_state, speed_slider],
+            outputs=[story_card, tree_patch, search_index_state, step_button],
+            concurrency_limit=PLAY_CONCURRENCY
+        )
+
+        # Pause button - stop the autoplay where it is
+        pause_button.click(fn=None, cancels=[play_event])
+
+        reset_button.click(
+            fn=handle_reset,
+            inputs=[stage_state, trace_state, presents_state],
+            outputs=[story_card, tree_display, search_index_state, jump_slider],
+            cancels=[play_event]
+        )
+
+        # Jump slider - show the search after any number of steps.
+        # Every step's state is looked up in the trace, so jumping to step
+        # 5000 costs the same as jumping to step 5.
+        def jump_game(stage, trace, presents, step):
+            """Handle the jump slider being released."""
+            trace, presents = fetch(trace), fetch(presents)
+            result = jump_to_step(stage, trace, presents, step)
+            if not result or result[0] is None:
+                return gr.update(), gr.update(), gr.update(), gr.update()
+            status_text, patch, search_idx, button_text = result
+            return status_text, patch, search_idx, gr.update(value=button_text)
+
+        @metrics.instrument("handle_jump")
+        async def handle_jump(stage, trace, presents, step, request: gr.Request = None):
+            """Jump in the fast pool (see offload.py)."""
+            return await off_loop(request, "handle_jump", "fast", 4, jump_game,
+                                  stage, trace, presents, step)
+
+        jump_slider.release(
+            fn=handle_jump,
+            inputs=[stage_state, trace_state, presents_state, jump_slider],
+            outputs=[story_card, tree_patch, search_index_state, step_button],
+            cancels=[play_event]
+        )
+
+        # Search method dropdown - search the same presents again with another method
+        def change_engine(stage, wish, presents, engine, request: gr.Request = None):
+            """Handle a new choice in the search method dropdown."""
+            presents = fetch(presents)
+            if stage != 4 or not presents:
+                return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), gr.update()
+            try:
+                status_text, tree_html, _, search_idx, trace = start_search(3, wish, presents, engine)
+            except ValueError as error:
+                # Keep the current search; only explain why this method can't be used
+                return (f"### ⚠️ Can't use {engine.lower()} here\n\n{error}",
+                        gr.update(), gr.update(), gr.update(), gr.update(), gr.update())
+            metrics.record_search(trace)
+            return (status_text, tree_html, search_idx, keep(request, "trace", trace),
+                    gr.update(value="Step"), jump_update(trace))
+
+        @metrics.instrument("handle_engine_change")
+        async def handle_engine_change(stage, wish, presents, engine, request: gr.Request = None):
+            """Run the new search in the heavy pool (see offload.py)."""
+            return await off_loop(request, "handle_engine_change", "heavy", 6, change_engine,
+                                  stage, wish, presents, engine, request)
+
+        engine_dropdown.input(
+            fn=handle_engine_change,
+            inputs=[stage_state, wish_state, presents_state, engine_dropdown],
+            outputs=[story_card, tree_display, search_index_state, trace_state, step_button,
+                     jump_slider],
+            cancels=[play_event]
+        )
+
+        # Compare button - measure every search method on the current presents
+        @metrics.instrument("handle_compare")
+        def handle_compare(stage, wish, presents):
+            """Handle compare button click."""
+            presents = fetch(presents)
+            if stage != 4 or not presents:
+                return gr.update()
+            stats = compare_engines(presents, wish)
+            return (
+                f"#### How the search methods compare on these {len(presents):,} presents\n\n"
+                + format_engine_table(stats)
+                + "\n\n_Setup work is sorting or building an index before the first comparison; "
+                "it only pays off if you search the same presents many times._"
+            )
+
+        compare_button.click(
+            fn=handle_compare,
+            inputs=[stage_state, wish_state, presents_state],
+            outputs=[engine_stats]
+        )
+
+        # Save replay button - write the search as a self-contained web page
+        @metrics.instrument("handle_replay")
+        def handle_replay(stage, trace):
+            """Handle save replay button click."""
+            trace = fetch(trace)
+            if stage != 4 or trace is None:
+                return gr.update()
+            path = REPLAY_DIR / f"replay-{trace.key:016x}.html"
+            if not path.exists():
+                REPLAY_DIR.mkdir(parents=True, exist_ok=True)
+                # Write to a temporary file of our own first, so a half-written
+                # file is never served and two saves of the same search (a
+                # double click) don't write over each other
+                with tempfile.NamedTemporaryFile(dir=REPLAY_DIR, prefix="replay-", suffix=".partial",
+                                                 delete=False) as partial:
+                    pass
+                try:
+                    write_replay(trace, partial.name)
+                    os.replace(partial.name, path)
+                finally:
+                    Path(partial.name).unlink(missing_ok=True)
+                prune_replays()
+            return gr.update(value=str(path), visible=True)
+
+        replay_button.click(
+            fn=handle_replay,
+            inputs=[stage_state, trace_state],
+            outputs=[replay_file]
+        )
+
+        # Find them all button - one pass over the presents for every wish
+        @metrics.instrument("handle_multi_wish")
+        def handle_multi_wish(presents, wishes_text):
+            """Handle find them all button click."""
+            presents = fetch(presents)
+            if not presents:
+                return "Wake up on Christmas morning first, so there are presents to search.", ""
+            wishes = parse_wishes(wishes_text or "")
+            if not wishes:
+                return "Type the gifts to search for, separated by commas.", ""
+            result = multi_wish_search(presents, wishes)
+            metrics.record_comparisons("Multi-wish search", result.comparisons)
+            return (
+                format_multi_wish_result(result, len(presents)),
+                create_multi_wish_tree(presents, result)
+            )
+
+        multi_wish_button.click(
+            fn=handle_multi_wish,
+            inputs=[presents_state, wishes_input],
+            outputs=[multi_wish_result, multi_wish_tree]
+        )
+
+        # Search my list button - linear search over the uploaded file
+        @metrics.instrument("handle_file_search")
+        def handle_file_search(path, gift, wish):
+            """Handle search my list button click."""
+            gift = (gift or "").strip() or wish
+            if not path:
+                return "Upload a list of presents first."
+            if not gift:
+                return "Type the gift to search for (or save your wish first)."
+            result = search_file(path, gift)
+            metrics.record_comparisons("File search", result.lines_checked)
+            return format_file_result(result, gift, os.path.basename(path))
+
+        file_search_button.click(
+            fn=handle_file_search,
+            inputs=[list_file, file_wish, wish_state],
+            outputs=[file_result]
+        )
+
+        # Simulate button - play many games at once with NumPy
+        @metrics.instrument("handle_simulate")
+        def handle_simulate(games, min_presents, max_presents, wish_probability, pool_size,
+                            wish_in_pool):
+            """Handle simulate button click."""
+            # NumPy and pandas are only needed here, so they are imported on
+            # the first simulation rather than with the app
+            import pandas as pd
+            from analytics import comparison_bars, cost_rows, format_simulation, simulate_games
+
+            try:
+                result = simulate_games(
+                    min(int(games), MAX_SIMULATED_GAMES),
+                    min(int(min_presents), MAX_SIMULATED_PRESENTS),
+                    min(int(max_presents), MAX_SIMULATED_PRESENTS),
+                    wish_probability, int(pool_size), wish_in_pool,
+                )
+            except (TypeError, ValueError) as error:
+                return f"Can't simulate that: {error}", gr.update(visible=False), gr.update(visible=False)
+
+            cost = pd.DataFrame(cost_rows(result), columns=["presents", "series", "comparisons"])
+            bars = comparison_bars(result.comparison_counts)
+            distribution = pd.DataFrame(bars, columns=["comparisons", "share of games"])
+            note = "" if not wish_in_pool else (
+                "\n\n_With the wish in the pool it can also turn up by chance, so searches "
+                "stop earlier than the theory for a single copy says._"
+            )
+            return (
+                format_simulation(result, wish_probability) + note,
+                gr.update(value=cost, visible=True),
+                gr.update(value=distribution, sort=[label for label, _ in bars], visible=True),
+            )
+
+        simulate_button.click(
+            fn=handle_simulate,
+            inputs=[sim_games, sim_min_presents, sim_max_presents, sim_wish_probability,
+                    sim_pool_size, sim_wish_in_pool],
+            outputs=[sim_result, sim_cost_plot, sim_distribution_plot]
+        )
+
+        # Count open browser tabs for the /metrics page
+        def open_session(request: gr.Request):
+            metrics.session_opened(request.session_hash)
+
+        def close_session(request: gr.Request):
+            metrics.session_closed(request.session_hash)
+            # Nobody is waiting for this tab's work any more
+            cancel_session(request.session_hash)
+            if SESSION_STORE is not None:
+                for name in ("presents", "trace"):
+                    SESSION_STORE.delete(f"{request.session_hash}:{name}")
+
+        demo.load(fn=open_session)
+        demo.unload(close_session)
+
+    # Queue every event so bursts of clicks wait their turn instead of all
+    # running at once (see the SANTA_* settings at the top of the file).
+    # max_threads must be set before queue(), which sizes the queue from it.
+    # demo.launch() resets it from its own max_threads argument, so pass
+    # max_threads=app.MAX_THREADS when launching the demo yourself.
+    demo.max_threads = MAX_THREADS
+    demo.queue(max_size=QUEUE_MAX_SIZE, default_concurrency_limit=DEFAULT_CONCURRENCY)
+
+    return demo
+
+
+_demo = None
+
+
+def __getattr__(name):
+    """
+    Build the interface the first time someone asks for app.demo.
+
+    Tools like `gradio app.py` look for a variable called demo; building it
+    on first use means importing app.py alone doesn't pay for Gradio.
+    """
+    global _demo
+    if name == "demo":
+        if _demo is None:
+            _demo = build_demo()
+        return _demo
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def build_server():
+    """
+    Put the Gradio app on a FastAPI server that also serves /metrics.
+
+    Returns:
+        server (FastAPI): The server, ready to run with uvicorn.
+    """
+    import gradio as gr
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+
+    server = FastAPI()
+
+    @server.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        return metrics.render_prometheus()
+
+    demo = build_demo()
+    return gr.mount_gradio_app(server, demo, path="/",
+                               max_file_size=f"{MAX_UPLOAD_MB}mb", allowed_paths=[str(REPLAY_DIR)])
+
 
 # Only run the app if this file is executed directly.
 if __name__ == "__main__":
-    demo.launch()
+    import uvicorn
+
+    uvicorn.run(
+        build_server(),
+        host=os.environ.get("GRADIO_SERVER_NAME", "127.0.0.1"),
+        port=int(os.environ.get("GRADIO_SERVER_PORT", "7860")),
+    )
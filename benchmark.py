@@ -0,0 +1,313 @@
+"""
+Benchmarks for the Christmas Linear Search Game.
+
+Times the main building blocks of the app (making presents, drawing the
+tree, starting and stepping the search, and the wired Gradio handlers)
+for lists from 10 up to 1,000,000 presents. For every benchmark and size
+it reports:
+    - time: best wall-clock time of a few runs (milliseconds)
+    - peak memory: largest amount of memory allocated during one run (KB)
+    - output size: bytes of HTML/JSON the step would send to the browser
+
+Usage:
+    python benchmark.py                  # run and print the results
+    python benchmark.py --save           # also store them as the baseline
+    python benchmark.py --compare        # fail if any output got bigger than the baseline
+    python benchmark.py --compare --check-time  # also fail if anything got slower
+    python benchmark.py --sizes 10 1000  # only some list sizes
+
+Output sizes are the same on every machine, so --compare checks them
+against the committed baseline. Timings depend on the machine: --compare
+only reports slowdowns, unless --check-time is given. Before using
+--check-time, run --save on the same machine (without committing the new
+timings).
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import app
+import game_core
+
+BASELINE_PATH = Path(__file__).with_name("benchmark_baseline.json")
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+WISH = "Basketball"
+SEED = 2024
+MIN_TIME_DIFFERENCE_MS = 0.05
+
+# Async handlers (see offload.py) are run on this loop, so every call pays
+# the same thread-pool hop as in the app, but not for starting a new loop
+EVENT_LOOP = asyncio.new_event_loop()
+
+
+def wired_handler(name):
+    """
+    Find an event handler function that was wired up inside the Blocks app.
+
+    Parameters:
+        name (str): Function name, e.g. "handle_step".
+
+    Returns:
+        The handler function (async handlers are wrapped to run on EVENT_LOOP).
+    """
+    for block_fn in app.demo.fns.values():
+        if block_fn.name == name:
+            handler = block_fn.fn
+            if inspect.iscoroutinefunction(handler):
+                return lambda *args: EVENT_LOOP.run_until_complete(handler(*args))
+            return handler
+    raise LookupError(f"No event handler named {name!r}")
+
+
+def output_size(value, top_level=True):
+    """
+    Count how many bytes an output would take when sent to the browser.
+    """
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, tuple) and top_level:
+        # Handler outputs; lists and tuples inside are game state kept on the server
+        return sum(output_size(item, top_level=False) for item in value)
+    if isinstance(value, dict):
+        return len(json.dumps(value).encode("utf-8"))
+    return 0
+
+
+def make_presents(size):
+    """
+    Make a reproducible list of presents that does not contain the wish,
+    so searches run through the whole list (the worst case).
+    """
+    random.seed(SEED)
+    return [random.choice(game_core.OTHER_GIFTS) for _ in range(size)]
+
+
+# --------------------------------------
+# The benchmarks
+# --------------------------------------
+# Each benchmark takes the list size and returns a function to time.
+# Setup work (like making the presents) happens outside the timed function.
+
+def bench_generate_presents(size):
+    return lambda: game_core.generate_presents(WISH, size)
+
+
+def bench_generate_present_list(size):
+    return lambda: game_core.generate_present_list(WISH, size)
+
+
+def bench_create_tree_with_search(size):
+    presents = make_presents(size)
+    return lambda: game_core.create_tree_with_search(presents, WISH, size // 2, -1)
+
+
+def bench_start_search(size):
+    presents = make_presents(size)
+    return lambda: game_core.start_search(3, WISH, presents)
+
+
+def bench_step_search(size):
+    presents = make_presents(size)
+    trace = game_core.build_search_trace(presents, WISH)
+    return lambda: game_core.step_search(4, trace, presents, size // 2)
+
+
+def bench_handle_step(size):
+    presents = make_presents(size)
+    trace = game_core.build_search_trace(presents, WISH)
+    handle_step = wired_handler("handle_step")
+    return lambda: handle_step(4, trace, presents, size // 2)
+
+
+def bench_handle_advance(size):
+    # Stage 3: wake up on Christmas morning (generates and draws the presents)
+    handle_advance = wired_handler("handle_advance")
+
+    def run():
+        previous = app.LARGE_LIST_PRESENTS
+        app.LARGE_LIST_PRESENTS = size
+        try:
+            return handle_advance(3, WISH, [], "", game_core.LINEAR_SEARCH)
+        finally:
+            app.LARGE_LIST_PRESENTS = previous
+    return run
+
+
+BENCHMARKS = {
+    "generate_presents": bench_generate_presents,
+    "generate_present_list": bench_generate_present_list,
+    "create_tree_with_search": bench_create_tree_with_search,
+    "start_search": bench_start_search,
+    "step_search": bench_step_search,
+    "handle_step": bench_handle_step,
+    "handle_advance": bench_handle_advance,
+}
+
+# These draw the tree. Long lists are drawn as a window (see
+# game_core.TREE_WINDOW), so these are cheap even for a million presents,
+# but --max-render-size can still skip the largest sizes.
+FULL_RENDER_BENCHMARKS = {"create_tree_with_search", "start_search", "handle_advance"}
+
+
+def measure(fn, min_time=0.2, max_repeats=50):
+    """
+    Time a function and measure its memory use.
+
+    The function is run a few times (until min_time seconds have passed) and
+    the best time is kept. Memory is measured in one extra run with
+    tracemalloc turned on, because tracing slows everything down.
+
+    Parameters:
+        fn (callable): The function to measure.
+        min_time (float): Keep repeating until this many seconds have passed.
+        max_repeats (int): Never run more than this many times.
+
+    Returns:
+        dict: {"time_ms", "peak_kb", "output_bytes"}
+    """
+    best = float("inf")
+    total = 0.0
+    repeats = 0
+    while repeats < max_repeats and (repeats == 0 or total < min_time):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        repeats += 1
+
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "time_ms": round(best * 1000, 4),
+        "peak_kb": round(peak / 1024, 1),
+        "output_bytes": output_size(result),
+    }
+
+
+def run_benchmarks(names, sizes, max_render_size):
+    """
+    Run the chosen benchmarks for every list size.
+
+    Parameters:
+        names (list[str]): Benchmarks to run (keys of BENCHMARKS).
+        sizes (list[int]): List sizes to run them with.
+        max_render_size (int): Largest size for FULL_RENDER_BENCHMARKS.
+
+    Returns:
+        dict: results[benchmark_name][str(size)] = measurement
+    """
+    results = {}
+    for name in names:
+        results[name] = {}
+        for size in sizes:
+            if name in FULL_RENDER_BENCHMARKS and size > max_render_size:
+                print(f"{name:<24}{size:>10}{'skipped (see --max-render-size)':>44}")
+                continue
+            random.seed(SEED)
+            measurement = measure(BENCHMARKS[name](size))
+            results[name][str(size)] = measurement
+            print(f"{name:<24}{size:>10}{measurement['time_ms']:>14.3f}"
+                  f"{measurement['peak_kb']:>14.1f}{measurement['output_bytes']:>16}")
+    return results
+
+
+def compare(results, baseline, time_tolerance, size_tolerance):
+    """
+    Compare results with the stored baseline.
+
+    A result is a regression if its output is more than size_tolerance times
+    bigger than the baseline, and a slowdown if it is more than
+    time_tolerance times slower. Slowdowns smaller than MIN_TIME_DIFFERENCE_MS
+    are ignored, since very fast benchmarks vary a lot from run to run.
+
+    Returns:
+        (regressions, slowdowns): two lists with one message each
+        (both empty if everything is fine)
+    """
+    regressions = []
+    slowdowns = []
+    for name, by_size in results.items():
+        for size, measurement in by_size.items():
+            old = baseline.get(name, {}).get(size)
+            if old is None:
+                continue
+            slower_by = measurement["time_ms"] - old["time_ms"]
+            if (measurement["time_ms"] > old["time_ms"] * time_tolerance
+                    and slower_by > MIN_TIME_DIFFERENCE_MS):
+                slowdowns.append(
+                    f"{name} [{size}]: {measurement['time_ms']:.3f} ms "
+                    f"(baseline {old['time_ms']:.3f} ms)"
+                )
+            if measurement["output_bytes"] > old["output_bytes"] * size_tolerance:
+                regressions.append(
+                    f"{name} [{size}]: {measurement['output_bytes']} bytes "
+                    f"(baseline {old['output_bytes']} bytes)"
+                )
+    return regressions, slowdowns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Christmas Linear Search Game.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="list sizes to benchmark")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS),
+                        help="only run these benchmarks")
+    parser.add_argument("--max-render-size", type=int, default=1_000_000,
+                        help="largest size for benchmarks that draw the whole tree")
+    parser.add_argument("--save", action="store_true",
+                        help="store the results as the new baseline")
+    parser.add_argument("--compare", action="store_true",
+                        help="exit with an error if any output got bigger than the baseline")
+    parser.add_argument("--check-time", action="store_true",
+                        help="with --compare, also fail on slowdowns (only meaningful "
+                             "against a baseline saved on this machine)")
+    parser.add_argument("--time-tolerance", type=float, default=1.5,
+                        help="allowed slowdown factor before --compare fails")
+    parser.add_argument("--size-tolerance", type=float, default=1.05,
+                        help="allowed output growth factor before --compare fails")
+    args = parser.parse_args()
+
+    print(f"{'benchmark':<24}{'size':>10}{'time (ms)':>14}{'peak (KB)':>14}{'output (bytes)':>16}")
+    results = run_benchmarks(args.only, args.sizes, args.max_render_size)
+
+    if args.compare:
+        if not BASELINE_PATH.exists():
+            sys.exit(f"No baseline at {BASELINE_PATH}; run with --save first.")
+        baseline = json.loads(BASELINE_PATH.read_text())
+        regressions, slowdowns = compare(results, baseline, args.time_tolerance, args.size_tolerance)
+        if slowdowns:
+            print("\nSlower than the baseline" + ("" if args.check_time else
+                  " (not checked, since timings depend on the machine; see --check-time)") + ":")
+            for message in slowdowns:
+                print(f"  {message}")
+        if args.check_time:
+            regressions += slowdowns
+        if regressions:
+            print("\nRegressions:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+    if args.save:
+        # Keep baseline entries for benchmarks/sizes we didn't run this time
+        baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        for name, by_size in results.items():
+            baseline.setdefault(name, {}).update(by_size)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nSaved baseline to {BASELINE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Play many Christmas linear search games without the web interface.
+
+Each game picks a wish, puts presents under the tree (same rules as the
+app) and runs the linear search. One JSON line is written per game, and a
+short summary is printed at the end.
+
+Usage:
+    python cli.py --games 100000 --seed 42 --output games.jsonl
+    python cli.py --games 10 --wish "Lego Set" --include-presents
+
+The same --seed always gives the same games.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from game_core import (
+    COMPACT_LIST_SIZE,
+    OTHER_GIFTS,
+    build_search_trace,
+    generate_present_list,
+    generate_presents,
+)
+
+# Wishes to pick from when --wish isn't given: some are in Santa's gift
+# pool (so they can show up more than once) and some are not.
+DEFAULT_WISHES = ("Basketball", "Bike", "Lego Set", "Book", "Headphones", "Scooter")
+
+
+def play_game(game_number, wish, num_presents, include_presents=False):
+    """
+    Play one game and describe the result.
+
+    Parameters:
+        game_number (int): Which game this is (used in the output).
+        wish (str): The gift the kid asked for.
+        num_presents (int): How many presents are under the tree.
+        include_presents (bool): Also return the list of presents.
+
+    Returns:
+        dict: The game result, ready to be written as JSON.
+    """
+    if num_presents > COMPACT_LIST_SIZE:
+        presents = generate_present_list(wish, num_presents)
+    else:
+        presents = generate_presents(wish, num_presents)
+    trace = build_search_trace(presents, wish)
+
+    result = {
+        "game": game_number,
+        "wish": wish,
+        "num_presents": trace.num_presents,
+        "found": trace.found_index != -1,
+        "found_index": trace.found_index,
+        "comparisons": trace.comparisons,
+    }
+    if include_presents:
+        result["presents"] = list(presents)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many Christmas linear search games.")
+    parser.add_argument("--games", type=int, default=1000, help="how many games to play")
+    parser.add_argument("--seed", type=int, default=None, help="random seed (same seed, same games)")
+    parser.add_argument("--wish", default=None,
+                        help="always wish for this gift (default: pick one per game)")
+    parser.add_argument("--min-presents", type=int, default=5, help="fewest presents per game")
+    parser.add_argument("--max-presents", type=int, default=12, help="most presents per game")
+    parser.add_argument("--include-presents", action="store_true",
+                        help="write the list of presents for every game too")
+    parser.add_argument("--output", default="-", help="JSON lines file to write (default: stdout)")
+    args = parser.parse_args()
+
+    if args.min_presents > args.max_presents:
+        parser.error("--min-presents must not be larger than --max-presents")
+
+    random.seed(args.seed)
+    wishes = (args.wish,) if args.wish else DEFAULT_WISHES
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    found = 0
+    total_comparisons = 0
+    start = time.perf_counter()
+    try:
+        for game_number in range(args.games):
+            wish = random.choice(wishes)
+            num_presents = random.randint(args.min_presents, args.max_presents)
+            result = play_game(game_number, wish, num_presents, args.include_presents)
+            output.write(json.dumps(result) + "\n")
+            found += result["found"]
+            total_comparisons += result["comparisons"]
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    # Summary goes to stderr so it doesn't mix with the JSON lines
+    if args.games:
+        print(
+            f"{args.games} games in {elapsed:.2f}s: "
+            f"gift found in {found / args.games:.1%}, "
+            f"{total_comparisons / args.games:.2f} comparisons per game on average "
+            f"(gift pool: {len(OTHER_GIFTS)} gifts)",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
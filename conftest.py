@@ -0,0 +1,2 @@
+# Lets the tests in tests/ import the game's modules (game_core, app, ...)
+# from this folder when they are run with plain `pytest`.
@@ -0,0 +1,200 @@
+"""
+Linear search over your own list of presents, stored in a file.
+
+The file is a plain text file with one present per line, or a CSV file
+whose first column is the present. It can be hundreds of MB: instead of
+reading it into a Python list, the file is memory-mapped and searched as
+raw bytes, so only the pages the search touches are read and the worker
+never holds the whole list in memory.
+
+The search still checks the presents (lines) in order and stops at the
+first match, and reports where it found the gift: the line number and the
+byte offset of that line in the file.
+
+Usage:
+    python file_search.py inventory.txt "Lego Set"
+    python file_search.py inventory.csv "Lego Set"
+"""
+
+import argparse
+import mmap
+import re
+import unicodedata
+from collections import namedtuple
+from pathlib import Path
+
+# Lines are counted in blocks of this many bytes, so counting them never
+# copies more than one block at a time.
+COUNT_BLOCK = 16 * 1024 * 1024
+
+# Lines of the file shown around the match
+CONTEXT_LINES = 3
+
+# The result of searching one file:
+#   - found: whether the gift is in the file
+#   - line_number: line of the match, counting from 1 (0 if not found)
+#   - byte_offset: where that line starts in the file (-1 if not found)
+#   - lines_checked: presents checked (the match's line, or every line)
+#   - file_size: size of the file in bytes
+#   - context: [(line_number, text)] for a few lines around the match
+FileSearchResult = namedtuple(
+    "FileSearchResult",
+    ["found", "line_number", "byte_offset", "lines_checked", "file_size", "context"],
+)
+
+
+def is_csv(path):
+    """
+    Files ending in .csv have the present in their first column.
+    """
+    return Path(path).suffix.lower() == ".csv"
+
+
+def wish_pattern(wish, csv=False, after_break=True):
+    """
+    Build the pattern for a line that holds exactly the wish.
+
+    Matching ignores spaces around the name and treats any run of spaces
+    or tabs inside it as one space. The wish is NFKC-normalized like in the
+    game (see game_core.normalize_gift), but since the file is scanned as
+    raw bytes, upper/lower case is only ignored for ASCII letters. In a CSV
+    file only the first column counts, and it may be in double quotes.
+
+    The pattern starts with the line break before the line: scanning for
+    a "\n" is much faster than trying every position as a line start.
+
+    Parameters:
+        wish (str): The gift we're searching for
+        csv (bool): Only match the first column of a CSV line
+        after_break (bool): Start with the line break (False: for the first
+            line, which has none; use it with .match at position 0)
+
+    Returns:
+        re.Pattern: A bytes pattern matching "\n" followed by the line
+    """
+    words = unicodedata.normalize("NFKC", wish).split()
+    name = rb"[ \t]+".join(re.escape(word.encode("utf-8")) for word in words)
+    if csv:
+        field = rb'(?:"[ \t]*' + name + rb'[ \t]*"|' + name + rb")"
+        end = rb"[ \t]*(?:,|\r?$)"
+    else:
+        field = name
+        end = rb"[ \t]*\r?$"
+    line_break = rb"\n" if after_break else b""
+    return re.compile(line_break + rb"[ \t]*" + field + end, re.IGNORECASE | re.MULTILINE)
+
+
+def count_lines(data, end):
+    """
+    Count the line breaks in data[:end], one block at a time.
+    """
+    lines = 0
+    for block_start in range(0, end, COUNT_BLOCK):
+        lines += data[block_start:min(end, block_start + COUNT_BLOCK)].count(b"\n")
+    return lines
+
+
+def line_context(data, byte_offset, line_number, file_size):
+    """
+    Read a few lines before and after the line starting at byte_offset.
+
+    Returns:
+        list[tuple[int, str]]: (line number, text) pairs
+    """
+    start = byte_offset
+    for _ in range(CONTEXT_LINES):
+        if start == 0:
+            break
+        start = data.rfind(b"\n", 0, start - 1) + 1
+    first_line = line_number - data[start:byte_offset].count(b"\n")
+
+    end = byte_offset
+    for _ in range(CONTEXT_LINES + 1):
+        next_break = data.find(b"\n", end)
+        if next_break == -1:
+            end = file_size
+            break
+        end = next_break + 1
+
+    text = data[start:end].decode("utf-8", errors="replace")
+    return [(first_line + i, line.rstrip("\r")) for i, line in enumerate(text.splitlines())]
+
+
+def search_file(path, wish):
+    """
+    Find the first line of a file that holds the wish.
+
+    Parameters:
+        path (str or Path): Text file (one present per line) or CSV file
+        wish (str): The gift we're searching for
+
+    Returns:
+        FileSearchResult: Where the gift was found and how many lines were checked
+    """
+    path = Path(path)
+    file_size = path.stat().st_size
+    if file_size == 0 or not wish.strip():
+        return FileSearchResult(False, 0, -1, 0, file_size, [])
+
+    pattern = wish_pattern(wish, csv=is_csv(path))
+    first_line_pattern = wish_pattern(wish, csv=is_csv(path), after_break=False)
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # The first line has no line break before it, so check it on its own,
+        # in place (a file without line breaks is all one line)
+        if first_line_pattern.match(data) is not None:
+            byte_offset = 0
+        else:
+            # Then scan for a line break followed by the wish
+            match = pattern.search(data)
+            byte_offset = match.start() + 1 if match is not None else -1
+            # The match holds on to the mapped file; let it go before unmapping
+            del match
+        if byte_offset == -1:
+            # Linear search checked every line
+            total_lines = count_lines(data, file_size)
+            if data[-1:] != b"\n":
+                total_lines += 1
+            return FileSearchResult(False, 0, -1, total_lines, file_size, [])
+
+        line_number = count_lines(data, byte_offset) + 1
+        context = line_context(data, byte_offset, line_number, file_size)
+    return FileSearchResult(True, line_number, byte_offset, line_number, file_size, context)
+
+
+def format_file_result(result, wish, file_name):
+    """
+    Describe a file search in Markdown for the story card.
+    """
+    size = f"{result.file_size / (1024 * 1024):,.1f} MB" if result.file_size >= 1024 * 1024 \
+        else f"{result.file_size:,} bytes"
+    if not result.found:
+        return (
+            f"### 😢 Not found\n\n"
+            f"Linear search checked all **{result.lines_checked:,}** presents in "
+            f"**{file_name}** ({size}) and **{wish}** isn't there."
+        )
+    lines = "\n".join(
+        f"{'>' if number == result.line_number else ' '} {number:>8} | {text}"
+        for number, text in result.context
+    )
+    return (
+        f"### 🎉 Found it!\n\n"
+        f"**{wish}** is on line **{result.line_number:,}** of **{file_name}** ({size}), "
+        f"starting at byte **{result.byte_offset:,}**.\n\n"
+        f"Linear search checked **{result.lines_checked:,}** presents to find it.\n\n"
+        f"```\n{lines}\n```"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Linear search for a gift in a list file.")
+    parser.add_argument("path", help="text file (one present per line) or CSV file")
+    parser.add_argument("wish", help="the gift to search for")
+    args = parser.parse_args()
+
+    result = search_file(args.path, args.wish)
+    print(format_file_result(result, args.wish, Path(args.path).name))
+
+
+if __name__ == "__main__":
+    main()
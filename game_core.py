@@ -0,0 +1,1322 @@
+"""
+Game logic for the Christmas Linear Search Game.
+
+Everything here is plain Python with no Gradio: making the presents,
+running the linear search and drawing the tree as HTML. app.py wraps these
+functions in the web interface, and cli.py uses them to simulate many games
+without any interface at all.
+"""
+
+import html
+import itertools
+import operator
+import os
+import random
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict, namedtuple
+from collections.abc import Sequence
+from functools import lru_cache
+
+# --------------------------------------
+# Gift names: matching and ids
+# --------------------------------------
+# "Lego Set", "lego  set" and "ＬＥＧＯ Set" are the same gift, and so are
+# "Fußball" and "FUSSBALL". Every name is normalized once (see
+# normalize_gift) and given an id (see gift_id), so checking a present
+# against the wish is one comparison instead of building new lowercase
+# strings every time.
+
+
+@lru_cache(maxsize=65536)
+def normalize_gift(name):
+    """
+    The form of a gift name used for matching.
+
+    - Unicode NFKC, so full-width letters, ligatures and other look-alike
+      characters become the plain ones
+    - casefold, which is lower() plus the special cases (e.g. "ß" -> "ss")
+    - runs of spaces, tabs and other white space become one space, and
+      white space at the ends is removed
+
+    Parameters:
+        name (str): A gift name as typed or generated
+
+    Returns:
+        str: The normalized name (interned, so equal names are the same object)
+    """
+    name = unicodedata.normalize("NFKC", unicodedata.normalize("NFKC", name).casefold())
+    return sys.intern(" ".join(name.split()))
+
+
+@lru_cache(maxsize=65536)
+def gift_id(name):
+    """
+    The id of a gift name; names that normalize the same share an id.
+
+    Gifts in Santa's pool (OTHER_GIFTS) have fixed small integer ids. Any
+    other name (like a wish someone typed) uses its normalized, interned
+    name as its id, so no table of every name ever seen is kept: the only
+    memory used is the two bounded caches. Ids are only ever compared for
+    equality, and an int never equals a str.
+
+    Both steps are cached, so looking up a name that was seen before
+    allocates nothing.
+
+    Parameters:
+        name (str): A gift name as typed or generated
+
+    Returns:
+        int or str: The gift's id
+    """
+    key = normalize_gift(name)
+    return _POOL_GIFT_IDS.get(key, key)
+
+
+# --------------------------------------
+# Helper: generate presents (unsorted)
+# --------------------------------------
+
+# The gifts Santa picks from when he doesn't bring your wish.
+OTHER_GIFTS = (
+    "Toy Car",
+    "Book",
+    "Headphones",
+    "Puzzle",
+    "Lego Set",
+    "Board Game",
+    "Stuffed Animal",
+    "Video Game",
+)
+
+# Normalized pool gift name -> its fixed id (see gift_id)
+_POOL_GIFT_IDS = {normalize_gift(gift): i for i, gift in enumerate(OTHER_GIFTS)}
+
+# Largest list generate_present_list will make
+MAX_PRESENTS = 50_000_000
+
+
+def generate_presents(user_wish: str, num_presents: int, rng=random):
+    """
+    Create a list of presents under the tree.
+
+    - Each present is a string (gift name).
+    - The list is intentionally UNSORTED.
+    - There is a random chance that Santa includes the user's wish.
+
+    Parameters:
+        user_wish (str): The gift the user asked Santa for.
+        num_presents (int): How many presents are under the tree.
+        rng (random.Random): Where the random choices come from. Pass
+            random.Random(seed) to get the same presents every time.
+
+    Returns:
+        presents (list[str]): The unsorted list of gift names.
+    """
+    other_gifts = list(OTHER_GIFTS)
+
+    presents = []
+
+    # Fill the list with random gifts from the pool.
+    for _ in range(num_presents):
+        random_gift = rng.choice(other_gifts)
+        presents.append(random_gift)
+
+    # Randomly decide if Santa brings the user's wish this year.
+    # 65% chance the gift is in the list, 35% chance it's not
+    santa_brings_wish = rng.random() < 0.65
+
+    if santa_brings_wish and num_presents > 0:
+        # Replace one random present with the user's wish.
+        wish_index = rng.randrange(num_presents)
+        presents[wish_index] = user_wish
+
+    # Shuffle to make the list clearly unsorted.
+    rng.shuffle(presents)
+
+    return presents
+
+
+class PresentList(Sequence):
+    """
+    A compact, read-only list of presents for very large trees.
+
+    Instead of one string reference per present (8+ bytes each), every
+    present is stored as a one-byte category code that points into a small
+    vocabulary of gift names. It behaves like a normal list of strings
+    (len, indexing, iteration), so the search and display code can use it
+    the same way as the list from generate_presents.
+
+    Attributes:
+        vocabulary (tuple[str]): Gift names; a code c means vocabulary[c].
+        codes (bytes): One category code per present.
+    """
+
+    __slots__ = ("vocabulary", "codes")
+
+    def __init__(self, vocabulary, codes):
+        if len(vocabulary) > 256:
+            raise ValueError("PresentList supports at most 256 different gifts")
+        self.vocabulary = tuple(vocabulary)
+        self.codes = bytes(codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PresentList(self.vocabulary, self.codes[index])
+        return self.vocabulary[self.codes[index]]
+
+    def __repr__(self):
+        return f"PresentList({len(self)} presents, vocabulary={self.vocabulary!r})"
+
+    def find(self, wish):
+        """
+        Find the first present matching the wish (see gift_id).
+
+        The codes are scanned with bytes.find, which runs in C over the raw
+        bytes, instead of comparing one Python string at a time.
+
+        Parameters:
+            wish (str): The gift we're searching for
+
+        Returns:
+            int: Index of the first matching present, or -1 if not found
+        """
+        target = gift_id(wish)
+        first_index = -1
+        for code, gift in enumerate(self.vocabulary):
+            if gift_id(gift) != target:
+                continue
+            # Only look before the best match so far
+            end = first_index if first_index != -1 else len(self.codes)
+            index = self.codes.find(bytes([code]), 0, end)
+            if index != -1:
+                first_index = index
+        return first_index
+
+
+def generate_present_list(user_wish: str, num_presents: int, rng=random):
+    """
+    Create a large list of presents as a compact PresentList.
+
+    Same rules as generate_presents (random gifts from the pool, 65% chance
+    that one of them is the user's wish), but all the random gifts are
+    drawn in one call: we take one random byte per present and map each
+    byte to a gift code with bytes.translate, which runs in C.
+
+    Parameters:
+        user_wish (str): The gift the user asked Santa for.
+        num_presents (int): How many presents are under the tree.
+        rng (random.Random): Where the random choices come from (see generate_presents).
+
+    Returns:
+        presents (PresentList): The unsorted presents.
+    """
+    if not 0 <= num_presents <= MAX_PRESENTS:
+        raise ValueError(f"num_presents must be between 0 and {MAX_PRESENTS}")
+
+    # The wish gets the last code after the normal gifts.
+    vocabulary = OTHER_GIFTS + (user_wish,)
+    num_gifts = len(OTHER_GIFTS)
+
+    # Map every possible byte value (0-255) evenly onto the gift codes.
+    byte_to_code = bytes(value * num_gifts // 256 for value in range(256))
+    codes = bytearray(rng.randbytes(num_presents).translate(byte_to_code))
+
+    # 65% chance the gift is in the list, 35% chance it's not.
+    # The gifts are already in random order, so placing the wish at a random
+    # index is just as unsorted as shuffling afterwards.
+    if rng.random() < 0.65 and num_presents > 0:
+        codes[rng.randrange(num_presents)] = num_gifts
+
+    return PresentList(vocabulary, codes)
+
+
+# --------------------------------------
+# Virtual presents (computed on demand)
+# --------------------------------------
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def splitmix64(x):
+    """
+    Mix a 64-bit number into a random-looking 64-bit number (SplitMix64).
+
+    Output n of a SplitMix64 generator started at seed is
+    splitmix64(seed + n * _GOLDEN_GAMMA), so any position can be computed
+    without computing the ones before it.
+    """
+    z = (x + _GOLDEN_GAMMA) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+class VirtualPresents(Sequence):
+    """
+    A list of presents that is never stored: each one is computed when asked for.
+
+    The present at position p is a gift from the pool picked by a seeded
+    hash of p (see splitmix64), except at wish_index, where Santa put the
+    wish. It uses the same memory for a billion presents as for ten, and
+    the same seed always gives the same presents.
+
+    Slicing gives another VirtualPresents over part of the positions,
+    without computing any presents.
+
+    Attributes:
+        seed (int): 64-bit seed of the hash.
+        vocabulary (tuple[str]): The pool's gifts, then the wish (last).
+        wish_index (int): Position of the wish (-1 if Santa didn't bring it).
+        positions (range): Which positions this sequence shows.
+    """
+
+    __slots__ = ("seed", "vocabulary", "wish_index", "positions")
+
+    def __init__(self, seed, vocabulary, wish_index, positions):
+        self.seed = seed & _MASK64
+        self.vocabulary = tuple(vocabulary)
+        self.wish_index = wish_index
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def code_at(self, position):
+        """
+        The vocabulary code of the present at a position of the whole list.
+        """
+        if position == self.wish_index:
+            return len(self.vocabulary) - 1
+        mixed = splitmix64((self.seed + position * _GOLDEN_GAMMA) & _MASK64)
+        # Scale the 64-bit number onto the pool's codes
+        return (mixed * (len(self.vocabulary) - 1)) >> 64
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return VirtualPresents(self.seed, self.vocabulary, self.wish_index,
+                                   self.positions[index])
+        return self.vocabulary[self.code_at(self.positions[index])]
+
+    def __repr__(self):
+        return f"VirtualPresents({len(self)} presents, seed={self.seed})"
+
+    def find(self, wish):
+        """
+        Find the first present matching the wish (see gift_id).
+
+        Where Santa put the wish is already known. Only if the wish is also
+        one of the pool's gifts do the presents before it need checking,
+        and then a match usually turns up within a few presents.
+
+        Parameters:
+            wish (str): The gift we're searching for
+
+        Returns:
+            int: Index of the first matching present, or -1 if not found
+        """
+        target = gift_id(wish)
+        wish_code = len(self.vocabulary) - 1
+        pool_codes = {code for code, gift in enumerate(self.vocabulary[:-1])
+                      if gift_id(gift) == target}
+        placed = -1
+        if gift_id(self.vocabulary[wish_code]) == target and self.wish_index in self.positions:
+            placed = self.positions.index(self.wish_index)
+        if not pool_codes:
+            return placed
+
+        end = placed if placed != -1 else len(self.positions)
+        for i in range(end):
+            if self.code_at(self.positions[i]) in pool_codes:
+                return i
+        return placed
+
+
+def virtual_presents(seed, num_presents, user_wish):
+    """
+    Create presents computed on demand (see VirtualPresents).
+
+    Same rules as generate_presents: random gifts from the pool, and a 65%
+    chance that one of them is the user's wish, placed by random.Random(seed).
+
+    Parameters:
+        seed (int): Seed for the presents and for placing the wish
+        num_presents (int): How many presents are under the tree (any size)
+        user_wish (str): The gift the user asked Santa for
+
+    Returns:
+        presents (VirtualPresents): The unsorted presents
+    """
+    rng = random.Random(seed)
+    wish_index = -1
+    if rng.random() < 0.65 and num_presents > 0:
+        wish_index = rng.randrange(num_presents)
+    return VirtualPresents(rng.getrandbits(64), OTHER_GIFTS + (user_wish,), wish_index,
+                           range(num_presents))
+
+
+# --------------------------------------
+# Linear Search Functions
+# --------------------------------------
+
+# Every present box is in one of these states while we search.
+BOX_UNCHECKED = "unchecked"
+BOX_CHECKING = "checking"
+BOX_CHECKED = "checked"
+BOX_FOUND = "found"
+
+# Colors and status label for each box state: (background, border, status)
+BOX_STYLES = {
+    BOX_UNCHECKED: ("linear-gradient(135deg, #ff6b6b, #ee5a6f)", "#c92a2a", ""),
+    BOX_CHECKING: ("linear-gradient(135deg, #ffd43b, #fcc419)", "#f59f00", "Checking..."),
+    BOX_CHECKED: ("linear-gradient(135deg, #868e96, #495057)", "#343a40", "Checked"),
+    BOX_FOUND: ("linear-gradient(135deg, #51cf66, #40c057)", "#2f9e44", "✓ FOUND!"),
+}
+
+# The look of the tree and the present boxes. This is sent to the browser
+# once (app.py gives it to the HTML components that draw the tree), so each
+# box only needs a class name like "present checking" instead of a long
+# style="..." string.
+# The emoji and status labels come from CSS too, which keeps the box HTML
+# short and plain ASCII.
+TREE_CSS = """
+.santa-tree { text-align: center; padding: 20px; background: linear-gradient(to bottom, #87CEEB 0%, #E0F6FF 100%); border-radius: 10px; margin: 20px 0; }
+.santa-tree h3.tree-title { color: #2d5016; margin-bottom: 20px; }
+.santa-tree h3.tree-title::before { content: "🎄 "; }
+.santa-tree p.tree-intro { color: #333; margin-bottom: 20px; }
+.santa-tree .tree-icon { margin: 20px auto; color: #2d5016; font-size: 60px; line-height: 1; text-shadow: 2px 2px 4px rgba(0,0,0,0.3); }
+.santa-tree .tree-icon::before { content: "🎄"; }
+.santa-tree p.presents-title { font-weight: bold; color: #2d5016; margin: 30px 0 15px; font-size: 16px; }
+.santa-tree .presents { display: flex; flex-wrap: wrap; justify-content: center; align-items: center; }
+.present { display: inline-block; margin: 5px; padding: 10px; border: 3px solid; border-radius: 8px; text-align: center; min-width: 120px; box-shadow: 0 4px 6px rgba(0,0,0,0.2); color: white; font-size: 11px; }
+.present::before { content: "🎁"; display: block; font-size: 24px; }
+.present b { display: block; font-size: 12px; margin-bottom: 5px; }
+.present::after { display: block; font-size: 10px; margin-top: 3px; font-weight: bold; }
+.santa-tree .present-gap { align-self: center; font-size: 24px; color: #2d5016; margin: 0 10px; }
+.santa-tree p.window-summary { color: #333; font-size: 13px; margin-bottom: 10px; }
+.santa-tree .minimap { display: flex; height: 14px; max-width: 600px; margin: 0 auto 15px; border-radius: 4px; overflow: hidden; border: 1px solid #2d5016; }
+.santa-tree .minimap span.in-view { box-shadow: inset 0 -4px 0 #2d5016; }
+""" + "".join(
+    f'.present.{state} {{ background: {bg_color}; border-color: {border_color}; }}\n'
+    f'.present.{state}::after {{ content: "{status}"; }}\n'
+    f'.santa-tree .minimap span.{state} {{ background: {border_color}; }}\n'
+    for state, (bg_color, border_color, status) in BOX_STYLES.items()
+)
+
+# Lists longer than this are drawn as a window of TREE_WINDOW boxes around
+# the present being checked, plus a minimap of the whole list, so drawing
+# cost depends on the window size and not on the list length.
+# Set SANTA_TREE_WINDOW to change it.
+TREE_WINDOW = int(os.environ.get("SANTA_TREE_WINDOW", "100"))
+
+# Number of segments in the minimap strip
+MINIMAP_SEGMENTS = 100
+
+# Counter stamped into every full render so the browser always swaps in the
+# new HTML, even when it is identical to an earlier render it has since patched.
+_render_counter = itertools.count()
+
+
+def box_state(index, current_index, found_index, checked=None):
+    """
+    Work out which state a single present box is in.
+
+    Parameters:
+        index (int): Position of the present in the list
+        current_index (int): Current index being checked (-1 if not started, -2 if finished)
+        found_index (int): Index where gift was found (-1 if not found)
+        checked (set[int] or None): Indices already checked. None means a
+            linear search, where everything before current_index is checked.
+
+    Returns:
+        str: One of BOX_UNCHECKED, BOX_CHECKING, BOX_CHECKED or BOX_FOUND
+    """
+    if found_index != -1 and index == found_index:
+        return BOX_FOUND
+    if current_index == index:
+        return BOX_CHECKING
+    if checked is not None:
+        return BOX_CHECKED if index in checked else BOX_UNCHECKED
+    if current_index != -1 and current_index != -2 and index < current_index:
+        return BOX_CHECKED
+    return BOX_UNCHECKED
+
+
+@lru_cache(maxsize=8192)
+def render_present_box(gift, index, state):
+    """
+    Build the HTML for one present box.
+
+    The look of each state comes from TREE_CSS, so a box is just its id,
+    its state class, its index and the gift name.
+
+    The result only depends on (gift, index, state), so it is cached: while
+    stepping through a search, every box except the two that changed is
+    served straight from the cache.
+
+    Parameters:
+        gift (str): Name of the gift
+        index (int): Position of the present in the list
+        state (str): One of the BOX_* states
+
+    Returns:
+        str: HTML string for the present box
+    """
+    return f'<div id="present-{index}" class="present {state}"><b>[{index}]</b>{html.escape(gift)}</div>'
+
+
+def create_tree_with_search(presents, wish, current_index, found_index, checked=None,
+                            title="Presents under the tree (unsorted):", window=None):
+    """
+    Create the visual tree display with highlighted current gift being checked.
+
+    Long lists (more than `window` presents) only show the boxes around
+    current_index, the found box, counts for everything outside the view
+    and a minimap of the whole list (see render_present_window).
+    
+    Parameters:
+        presents (list): List of gift names
+        wish (str): The gift we're searching for
+        current_index (int): Current index being checked (-1 if not started, -2 if finished)
+        found_index (int): Index where gift was found (-1 if not found)
+        checked (set[int] or None): Indices already checked (see box_state)
+        title (str): Caption shown above the presents
+        window (int or None): Most boxes to draw (None means TREE_WINDOW)
+    
+    Returns:
+        str: HTML string for the tree and presents display (styled by TREE_CSS)
+    """
+    presents_html = render_presents(presents, current_index, found_index, checked, window)
+    return wrap_tree(presents_html, title)
+
+
+def render_presents(presents, current_index, found_index, checked=None, window=None):
+    """
+    Draw the present boxes (or, for long lists, the window) without the tree.
+
+    Takes the same parameters as create_tree_with_search.
+
+    Returns:
+        str: The boxes, ready for wrap_tree
+    """
+    if window is None:
+        window = TREE_WINDOW
+
+    if len(presents) <= window:
+        return ''.join(
+            render_present_box(gift, i, box_state(i, current_index, found_index, checked))
+            for i, gift in enumerate(presents)
+        )
+    return render_present_window(presents, current_index, found_index, checked, window)
+
+
+def wrap_tree(presents_html, title="Presents under the tree (unsorted):"):
+    """
+    Put already-drawn present boxes into the tree display.
+
+    Every call gets a new data-render number (see _render_counter), so
+    reusing the same presents_html still makes the browser redraw the tree.
+
+    Parameters:
+        presents_html (str): The boxes (or window) from create_tree_with_search
+        title (str): Caption shown above the presents
+
+    Returns:
+        str: HTML string for the tree and presents display (styled by TREE_CSS)
+    """
+    tree_view = f'<div class="santa-tree" data-render="{next(_render_counter)}"><h3 class="tree-title">Christmas Morning!</h3><p class="tree-intro">You run to the living room and see the Christmas tree...</p><div class="tree-icon"></div><p class="presents-title">{title}</p>{presents_html}</div>'
+    
+    return tree_view
+
+
+def render_present_window(presents, current_index, found_index, checked, window):
+    """
+    Draw only a window of a long list of presents.
+
+    Shows `window` boxes centred on current_index, the found box (if it is
+    outside the window), how many presents outside the window are checked
+    or not, and a minimap strip of the whole list.
+
+    Parameters:
+        presents (list): List of gift names
+        current_index (int): Current index being checked (-1 if not started, -2 if finished)
+        found_index (int): Index where gift was found (-1 if not found)
+        checked (set[int] or None): Indices already checked (see box_state)
+        window (int): How many boxes to draw
+
+    Returns:
+        str: HTML for the summary, minimap and boxes
+    """
+    num_presents = len(presents)
+    focus = current_index if current_index >= 0 else max(found_index, 0)
+    start = max(0, min(focus - window // 2, num_presents - window))
+    end = start + window
+
+    boxes = [
+        render_present_box(presents[i], i, box_state(i, current_index, found_index, checked))
+        for i in range(start, end)
+    ]
+    found_outside = found_index != -1 and not start <= found_index < end
+    if found_outside:
+        boxes.append('<span class="present-gap">...</span>')
+        boxes.append(render_present_box(presents[found_index], found_index, BOX_FOUND))
+
+    # Count checked presents outside the window without visiting them
+    if checked is None:
+        checked_total = current_index if current_index > 0 else 0
+        checked_inside = max(0, min(checked_total, end) - start)
+        checked_outside = checked_total - checked_inside
+    else:
+        checked_outside = sum(1 for i in checked if not start <= i < end)
+    unchecked_outside = num_presents - window - checked_outside - found_outside
+
+    summary = (
+        f'<p class="window-summary">Showing presents [{start}] to [{end - 1}] of {num_presents:,}. '
+        f'Outside this view: {checked_outside:,} checked, {unchecked_outside:,} not checked yet.</p>'
+    )
+    minimap = render_minimap(num_presents, current_index, found_index, checked, start, end)
+    return f'{summary}{minimap}<div class="presents">{"".join(boxes)}</div>'
+
+
+def render_minimap(num_presents, current_index, found_index, checked, view_start, view_end):
+    """
+    Draw a strip showing the search state of the whole list.
+
+    The list is split into MINIMAP_SEGMENTS equal parts, each colored like a
+    present box: green if it holds the match, yellow if it holds the present
+    being checked, gray if it has been checked, red if not. Parts inside the
+    current view are underlined. Neighbouring parts that look the same are
+    merged into one element.
+
+    Returns:
+        str: HTML for the minimap
+    """
+    segments = min(MINIMAP_SEGMENTS, num_presents)
+    # Segment s covers presents [s * num_presents // segments, (s + 1) * num_presents // segments)
+    def segment_of(index):
+        return index * segments // num_presents
+
+    if checked is None:
+        checked_segments = None
+    else:
+        checked_segments = {segment_of(i) for i in checked}
+
+    runs = []
+    for segment in range(segments):
+        low = -(-segment * num_presents // segments)
+        high = -(-(segment + 1) * num_presents // segments)
+        if low <= found_index < high:
+            state = BOX_FOUND
+        elif low <= current_index < high:
+            state = BOX_CHECKING
+        elif checked_segments is not None:
+            state = BOX_CHECKED if segment in checked_segments else BOX_UNCHECKED
+        elif high <= current_index:
+            state = BOX_CHECKED
+        else:
+            state = BOX_UNCHECKED
+        in_view = low < view_end and high > view_start
+        if runs and runs[-1][0] == (state, in_view):
+            runs[-1][1] += 1
+        else:
+            runs.append([(state, in_view), 1])
+
+    spans = ''.join(
+        f'<span class="{state}{" in-view" if in_view else ""}" style="flex:{count}"></span>'
+        for (state, in_view), count in runs
+    )
+    return f'<div class="minimap">{spans}</div>'
+
+
+# --------------------------------------
+# Seeded presents (cached)
+# --------------------------------------
+
+# How many (seed, size, wish) trees deal_presents remembers. Only trees
+# asked for by seed (?seed= in the page address) are cached: a fresh
+# random seed is almost never dealt twice, and a cache full of one-off
+# large lists would only hold on to memory.
+# Set SANTA_PRESENT_CACHE_SIZE to change it (0 turns the cache off).
+PRESENT_CACHE_SIZE = int(os.environ.get("SANTA_PRESENT_CACHE_SIZE", "64"))
+
+# Lists longer than this are made as a compact PresentList
+COMPACT_LIST_SIZE = 100
+
+# Lists longer than this are VirtualPresents, computed on demand instead of
+# stored. Set SANTA_VIRTUAL_LIST_SIZE to change it.
+VIRTUAL_LIST_SIZE = int(os.environ.get("SANTA_VIRTUAL_LIST_SIZE", "10000000"))
+
+
+def new_seed():
+    """
+    Pick a fresh seed for a game that didn't ask for one.
+    """
+    return random.randrange(2**32)
+
+
+def presents_for_seed(seed, num_presents, user_wish):
+    """
+    Make the presents for a seed, using a private random.Random(seed).
+
+    The same (seed, num_presents, user_wish) always gives the same presents,
+    and the global random module is never touched.
+
+    Returns:
+        presents (tuple[str], PresentList or VirtualPresents): The unsorted presents.
+    """
+    if num_presents > VIRTUAL_LIST_SIZE:
+        return virtual_presents(seed, num_presents, user_wish)
+    rng = random.Random(seed)
+    if num_presents > COMPACT_LIST_SIZE:
+        return generate_present_list(user_wish, num_presents, rng)
+    # A tuple, so a cached list can be shared by many games without
+    # one of them changing it for the others.
+    return tuple(generate_presents(user_wish, num_presents, rng))
+
+
+def deal_presents(seed, num_presents, user_wish, cache=False):
+    """
+    Make the presents for a seed and draw them.
+
+    A classroom replaying the same scenario (same seed, number of presents
+    and wish) gets the list and its first drawing straight from an LRU
+    cache of the last PRESENT_CACHE_SIZE trees.
+
+    Parameters:
+        seed (int): Seed for the private random number generator
+        num_presents (int): How many presents are under the tree
+        user_wish (str): The gift the user asked Santa for
+        cache (bool): Remember the result (use it for seeds that will be
+            asked for again, like one from the page address)
+
+    Returns:
+        (presents, presents_html): The presents (see presents_for_seed) and
+        their boxes before the search starts, ready for wrap_tree.
+    """
+    if cache:
+        return _cached_deal(seed, num_presents, user_wish)
+    return _deal(seed, num_presents, user_wish)
+
+
+def _deal(seed, num_presents, user_wish):
+    presents = presents_for_seed(seed, num_presents, user_wish)
+    # Only the boxes are cached, not the outer tree, so wrap_tree can give
+    # every game its own render number.
+    if len(presents) <= TREE_WINDOW:
+        presents_html = ''.join(
+            render_present_box(gift, i, BOX_UNCHECKED) for i, gift in enumerate(presents)
+        )
+    else:
+        presents_html = render_present_window(presents, -1, -1, None, TREE_WINDOW)
+    return presents, presents_html
+
+
+_cached_deal = lru_cache(maxsize=PRESENT_CACHE_SIZE)(_deal)
+
+
+def create_tree_patch(presents, current_index, found_index, previous_index=None):
+    """
+    Build only the boxes that changed since the previous search step.
+
+    One step of a search only ever changes two boxes: the present we
+    checked last time turns gray, and the present at current_index turns
+    yellow (or green if it is the match). Everything else is already on
+    screen, so we send just those two boxes instead of the whole tree.
+
+    Parameters:
+        presents (list): List of gift names
+        current_index (int): Index being checked in this step
+        found_index (int): Index where gift was found (-1 if not found)
+        previous_index (int or None): Index checked in the step before
+            (None means current_index - 1, as in linear search)
+
+    Returns:
+        dict: {"frame": int, "boxes": {"index": box_html}} for the changed boxes
+    """
+    if previous_index is None:
+        previous_index = current_index - 1
+    boxes = {}
+    if 0 <= previous_index < len(presents) and previous_index != current_index:
+        boxes[str(previous_index)] = render_present_box(presents[previous_index], previous_index, BOX_CHECKED)
+    if 0 <= current_index < len(presents):
+        state = BOX_FOUND if current_index == found_index else BOX_CHECKING
+        boxes[str(current_index)] = render_present_box(presents[current_index], current_index, state)
+    # The frame number makes every patch unique, so the browser applies it
+    # even if the same boxes change in the same way twice (e.g. after Reset).
+    return {"frame": next(_render_counter), "boxes": boxes}
+
+
+# --------------------------------------
+# Search engines
+# --------------------------------------
+# A search engine is a function engine(presents, wish) -> EngineRun, where:
+#   - layout: the presents in the order the engine searches them (the same
+#     list for linear search, a sorted copy for binary search)
+#   - probes: positions in layout that get checked, in order
+#   - found_index: position in layout of the match (-1 if not found)
+#   - setup_operations: work done before the first comparison (sorting,
+#     building an index, copying the list)
+#   - repeat_comparisons: comparisons needed to search for the same wish
+#     again afterwards (this is where self-organizing lists and indexes win)
+#   - notes: optional Markdown the engine wants to show when the search
+#     starts (e.g. which worker scanned which chunk); None for most engines
+#
+# Engines are registered by name in SEARCH_ENGINES with register_engine.
+# Linear search lives here; the others are in search_engines.py.
+EngineRun = namedtuple(
+    "EngineRun",
+    ["layout", "probes", "found_index", "setup_operations", "repeat_comparisons", "notes"],
+    defaults=[None],
+)
+
+# name -> (engine function, one-line description)
+SEARCH_ENGINES = {}
+
+# Engines that work on VirtualPresents: they only look at the presents they
+# check, instead of copying, sorting or indexing the whole list.
+LAZY_ENGINES = set()
+
+LINEAR_SEARCH = "Linear search"
+
+
+def register_engine(name, description, lazy=False):
+    """
+    Decorator that adds a search engine to SEARCH_ENGINES.
+
+    Parameters:
+        name (str): Name shown in the interface, e.g. "Linear search"
+        description (str): One sentence explaining how it searches
+        lazy (bool): The engine works on VirtualPresents (see LAZY_ENGINES)
+    """
+    def decorator(engine):
+        SEARCH_ENGINES[name] = (engine, description)
+        if lazy:
+            LAZY_ENGINES.add(name)
+        return engine
+    return decorator
+
+
+@register_engine(LINEAR_SEARCH, "Checks every present in order, starting from position [0].",
+                 lazy=True)
+def linear_search(presents, wish):
+    if isinstance(presents, (PresentList, VirtualPresents)):
+        found_index = presents.find(wish)
+    else:
+        # Compare gift ids: one cached lookup per present, no new strings.
+        # map + operator.indexOf run the loop in C and stop at the first match.
+        try:
+            found_index = operator.indexOf(map(gift_id, presents), gift_id(wish))
+        except ValueError:
+            found_index = -1
+
+    comparisons = found_index + 1 if found_index != -1 else len(presents)
+    return EngineRun(presents, range(comparisons), found_index, 0, comparisons)
+
+
+# Everything step_search needs to know about one search, worked out once
+# when the search starts:
+#   - wish: the gift we're searching for
+#   - num_presents: how many presents are in the list
+#   - found_index: position of the match in layout (-1 if the gift isn't there)
+#   - comparisons: how many presents the search checks in total
+#   - probes: positions in layout checked at each step (range(comparisons)
+#     for linear search, so it costs no memory)
+#   - layout: the presents in the order they are searched and shown
+#   - engine: name of the search engine used
+#   - notes: extra Markdown from the engine (see EngineRun), or None
+#   - key: a random number naming this search (for caching its frames, see
+#     search_frame); unlike id(), it stays the same in a session store
+# Step k checks probes[k], and it is the match exactly when it is the last
+# step and found_index != -1, so no per-step string comparison is needed.
+SearchTrace = namedtuple(
+    "SearchTrace",
+    ["wish", "num_presents", "found_index", "comparisons", "probes", "layout", "engine", "notes",
+     "key"],
+    defaults=[None, None],
+)
+
+
+def build_search_trace(presents, wish, engine=LINEAR_SEARCH):
+    """
+    Run the search once and record its outcome.
+
+    Parameters:
+        presents (list or PresentList): List of presents
+        wish (str): The gift we're searching for
+        engine (str): Name of a search engine in SEARCH_ENGINES
+
+    Returns:
+        SearchTrace: The precomputed search
+    """
+    if isinstance(presents, VirtualPresents) and engine not in LAZY_ENGINES:
+        raise ValueError(
+            f"{engine} needs every present in memory, which this list of {len(presents):,} "
+            f"presents is too big for. Try {', '.join(sorted(LAZY_ENGINES)).lower()}."
+        )
+    engine_fn, _ = SEARCH_ENGINES[engine]
+    run = engine_fn(presents, wish)
+    return SearchTrace(
+        wish, len(presents), run.found_index, len(run.probes), run.probes, run.layout, engine,
+        run.notes, int.from_bytes(os.urandom(8), "big"),
+    )
+
+
+def layout_title(trace):
+    """
+    Caption for the presents on the tree, depending on how they are laid out.
+    """
+    if trace.layout is None or trace.engine == LINEAR_SEARCH:
+        return "Presents under the tree (unsorted):"
+    return f"Presents as {trace.engine.lower()} sees them:"
+
+
+def checked_positions(trace, step):
+    """
+    Positions already checked before a given step of the search.
+
+    Returns:
+        set[int] or None: None when the search checks positions 0, 1, 2, ...
+        in order (then everything before the current position is checked,
+        see box_state); otherwise the set of positions checked so far.
+    """
+    if isinstance(trace.probes, range) and trace.probes.start == 0 and trace.probes.step == 1:
+        return None
+    return set(trace.probes[:max(step, 0)])
+
+
+def describe_step(trace, search_index):
+    """
+    Work out what one step of a precomputed search looks like.
+
+    Parameters:
+        trace (SearchTrace): The precomputed search
+        search_index (int): The step (0 = the first present checked)
+
+    Returns:
+        (status_text, current_index, previous_index, found_index, new_search_index, button_text)
+        where new_search_index is the next step, or -2 if the search is finished
+    """
+    presents = trace.layout
+    is_last_step = search_index >= trace.comparisons - 1
+    if trace.comparisons > 0:
+        current_index = trace.probes[search_index]
+        previous_index = trace.probes[search_index - 1] if search_index > 0 else -1
+    else:
+        # Nothing to check at all (e.g. a hash index that has no such gift)
+        current_index = previous_index = -1
+
+    # Check if current gift matches (looked up in the trace)
+    is_match = is_last_step and trace.found_index != -1
+    found_index = current_index if is_match else -1
+    
+    # Create status message
+    if is_match:
+        # Found it!
+        status_text = (
+            f"### 🎉 Found it!\n\n"
+            f"After using {trace.engine.lower()} to check the presents, "
+            f"we see that you are on the **nice list** and Santa brought your gift, hurray!\n\n"
+            f"**{trace.wish}** was found at position [{found_index}]!\n\n"
+            f"**{trace.engine} found your gift after checking {search_index + 1} present(s).**"
+        )
+        new_search_index = -2  # Mark as finished
+        button_text = "Play again"  # Change button to "Play again"
+    elif is_last_step:
+        # Reached the end, not found
+        if trace.comparisons == trace.num_presents:
+            searched_text = "iterating through the entire list of presents"
+            checked_text = f"We checked all {trace.num_presents} presents"
+            total_text = f"checked all {trace.num_presents} presents"
+        else:
+            searched_text = f"checking {trace.comparisons} of the {trace.num_presents} presents"
+            checked_text = f"We checked {trace.comparisons} of {trace.num_presents} presents"
+            total_text = f"checked {trace.comparisons} present(s)"
+        status_text = (
+            f"### 😔 Not found\n\n"
+            f"After using {trace.engine.lower()} and {searched_text}, "
+            f"we see that you are on the **naughty list** and Santa didn't bring your gift.\n\n"
+            f"{checked_text}, but **{trace.wish}** wasn't there.\n\n"
+            f"**{trace.engine} {total_text}.**"
+        )
+        new_search_index = -2  # Mark as finished
+        button_text = "Play again"  # Change button to "Play again"
+    else:
+        # Still searching
+        status_text = (
+            f"### 🔍 Checking present [{current_index}]...\n\n"
+            f"Current gift: **{presents[current_index]}**\n"
+            f"Looking for: **{trace.wish}**\n"
+            f"Result: ✗ Not a match\n\n"
+            f"**Progress:** Checked {search_index + 1} of {trace.num_presents} presents"
+        )
+        new_search_index = search_index + 1
+        button_text = "Step"  # Keep button as "Step"
+
+    return status_text, current_index, previous_index, found_index, new_search_index, button_text
+
+
+def step_search(stage, trace, presents_state, search_index):
+    """
+    Advance the search by one step.
+
+    The search itself was already done by build_search_trace, so this only
+    looks up the result for the current step.
+    
+    Parameters:
+        stage (int): Current stage (should be 4)
+        trace (SearchTrace): The precomputed search
+        presents_state (list): List of presents
+        search_index (int): Current step (for linear search, the index being checked)
+    
+    Returns:
+        Updated UI components and search state: (status_text, tree_patch, new_search_index, button_text)
+        where tree_patch only holds the present boxes that changed (see create_tree_patch),
+        or {"frame", "tree"} with the whole tree for lists drawn as a window
+    """
+    if stage != 4 or trace is None or not presents_state:
+        return None, None, None
+    
+    # Initialize search if not started
+    if search_index == -1:
+        search_index = 0
+    
+    # Check if we've already finished
+    if search_index == -2:
+        return None, None, -2
+    
+    (status_text, current_index, previous_index, found_index,
+     new_search_index, button_text) = describe_step(trace, search_index)
+    
+    # Update the visual display (only the boxes that changed this step).
+    # Long lists are drawn as a moving window, so there we redraw the
+    # window instead; it is never more than TREE_WINDOW boxes.
+    if trace.num_presents > TREE_WINDOW:
+        tree_html = create_tree_with_search(
+            trace.layout, trace.wish, current_index, found_index,
+            checked_positions(trace, search_index), layout_title(trace)
+        )
+        tree_patch = {"frame": next(_render_counter), "tree": tree_html}
+    else:
+        tree_patch = create_tree_patch(trace.layout, current_index, found_index, previous_index)
+    
+    return status_text, tree_patch, new_search_index, button_text
+
+
+# Drawn frames for jump_to_step, least recently used first:
+# (trace.key, step) -> presents_html. Set SANTA_FRAME_CACHE_SIZE to change
+# how many are kept.
+FRAME_CACHE_SIZE = int(os.environ.get("SANTA_FRAME_CACHE_SIZE", "256"))
+_frame_cache = OrderedDict()
+_frame_cache_lock = threading.Lock()
+
+
+def search_frame(trace, step):
+    """
+    The present boxes after `step` presents were checked, from a bounded cache.
+
+    Parameters:
+        trace (SearchTrace): The precomputed search
+        step (int): Presents checked so far (0 = none)
+
+    Returns:
+        str: The boxes (or window), ready for wrap_tree
+    """
+    key = (trace.key, step)
+    with _frame_cache_lock:
+        presents_html = _frame_cache.get(key)
+        if presents_html is not None:
+            _frame_cache.move_to_end(key)
+            return presents_html
+
+    if step == 0:
+        presents_html = render_presents(trace.layout, -1, -1)
+    else:
+        _, current_index, _, found_index, _, _ = describe_step(trace, step - 1)
+        presents_html = render_presents(trace.layout, current_index, found_index,
+                                        checked_positions(trace, step - 1))
+
+    with _frame_cache_lock:
+        _frame_cache[key] = presents_html
+        while len(_frame_cache) > FRAME_CACHE_SIZE:
+            _frame_cache.popitem(last=False)
+    return presents_html
+
+
+def jump_to_step(stage, trace, presents_state, step):
+    """
+    Show the search as it looks after any number of steps, forwards or backwards.
+
+    Every step's state comes straight from the trace (no replaying of the
+    steps before it), and drawn frames are cached (see search_frame).
+
+    Parameters:
+        stage (int): Current stage (should be 4)
+        trace (SearchTrace): The precomputed search
+        presents_state (list): List of presents
+        step (int): Presents checked so far (0 = back to the start)
+
+    Returns:
+        (status_text, tree_patch, new_search_index, button_text) like step_search,
+        where tree_patch is {"frame", "tree"} with the whole tree
+    """
+    if stage != 4 or trace is None or not presents_state:
+        return None, None, None, None
+
+    step = max(0, min(int(step), trace.comparisons))
+    if step == 0:
+        status_text, new_search_index, button_text = ready_text(trace), -1, "Step"
+    else:
+        status_text, _, _, _, new_search_index, button_text = describe_step(trace, step - 1)
+
+    tree_html = wrap_tree(search_frame(trace, step), layout_title(trace))
+    return status_text, {"frame": next(_render_counter), "tree": tree_html}, new_search_index, button_text
+
+
+def ready_text(trace):
+    """
+    Status text for a search that hasn't checked anything yet.
+    """
+    return (
+        f"### 🔍 Ready to search!\n\n"
+        f"Let's use **{trace.engine.lower()}** to find **{trace.wish}**.\n\n"
+        f"Click **Step** to check the presents one by one.\n\n"
+        f"**Total presents:** {trace.num_presents}"
+    )
+
+
+def reset_search(stage, trace, presents_state):
+    """
+    Reset the search to the beginning.
+    
+    Parameters:
+        stage (int): Current stage
+        trace (SearchTrace): The precomputed search
+        presents_state (list): List of presents
+    
+    Returns:
+        Updated UI components with search reset
+    """
+    if stage != 4 or trace is None or not presents_state:
+        return None, None, None
+    
+    # Reset to start of search
+    tree_html = create_tree_with_search(trace.layout, trace.wish, -1, -1, title=layout_title(trace))
+    
+    return ready_text(trace), tree_html, -1
+
+
+def start_search(stage, wish_state, presents_state, engine=LINEAR_SEARCH):
+    """
+    Transition from stage 3 to stage 4 (start the search).
+
+    This is where the whole search is computed (see build_search_trace);
+    the Step and Reset buttons only replay it.
+    
+    Parameters:
+        stage (int): Current stage (should be 3)
+        wish_state (str): The gift we're searching for
+        presents_state (list): List of presents
+        engine (str): Name of the search engine to use
+    
+    Returns:
+        Updated UI components to start search: (status_text, tree_html, new_stage, search_index, trace)
+    """
+    if stage != 3 or not presents_state or len(presents_state) == 0:
+        return None
+    
+    trace = build_search_trace(presents_state, wish_state, engine)
+    
+    # Initialize search - create tree with all presents visible (not checked yet)
+    tree_html = create_tree_with_search(trace.layout, wish_state, -1, -1, title=layout_title(trace))
+    
+    if engine == LINEAR_SEARCH:
+        status_text = (
+            f"### 🔍 Ready to search!\n\n"
+            f"Let's use **linear search** to find **{wish_state}**.\n\n"
+            f"**Linear search is great to use here** because:\n"
+            f"- The list of gifts is **small**. On average, families in Canada only have 5-12 gifts under their Christmas tree.\n"
+            f"- The gifts are **unsorted**.\n\n"
+            f"Click **Step** to check each present one by one, starting from position [0].\n\n"
+            f"**Total presents to check:** {len(presents_state)}"
+        )
+    else:
+        status_text = (
+            f"### 🔍 Ready to search!\n\n"
+            f"Let's use **{engine.lower()}** to find **{wish_state}**.\n\n"
+            f"{SEARCH_ENGINES[engine][1]}\n\n"
+            f"Click **Step** to check the presents one by one.\n\n"
+            f"**Total presents:** {len(presents_state)}"
+        )
+        if trace.notes:
+            status_text += f"\n\n{trace.notes}"
+    
+    return (status_text, tree_html, 4, -1, trace)
+
+
+# --------------------------------------
+# Searching for several wishes at once
+# --------------------------------------
+
+# Colors for the first match of each wish: (background, border). The first
+# wish is green like a normal match; the colors repeat after the last one.
+WISH_COLORS = (
+    ("linear-gradient(135deg, #51cf66, #40c057)", "#2f9e44"),
+    ("linear-gradient(135deg, #4dabf7, #339af0)", "#1c7ed6"),
+    ("linear-gradient(135deg, #b197fc, #9775fa)", "#7048e8"),
+    ("linear-gradient(135deg, #ffa94d, #ff922b)", "#e8590c"),
+    ("linear-gradient(135deg, #38d9a9, #20c997)", "#0ca678"),
+    ("linear-gradient(135deg, #f783ac, #f06595)", "#d6336c"),
+)
+
+TREE_CSS += "".join(
+    f'.present.found.wish-{slot} {{ background: {bg_color}; border-color: {border_color}; }}\n'
+    for slot, (bg_color, border_color) in enumerate(WISH_COLORS)
+)
+
+# The result of searching for several wishes in one pass:
+#   - wishes: the different wishes, in the order they were given
+#   - first_index: wish -> index of its first match (-1 if not found)
+#   - comparisons: how many presents were checked (the pass stops as soon
+#     as every wish has been found)
+MultiWishResult = namedtuple("MultiWishResult", ["wishes", "first_index", "comparisons"])
+
+
+def parse_wishes(text):
+    """
+    Split a list of wishes like "Bike, Lego Set, Book" (commas or new lines).
+
+    Wishes that are the same gift (see normalize_gift) are kept once.
+
+    Returns:
+        list[str]: The different wishes, in order
+    """
+    wishes = {}
+    for wish in text.replace("\n", ",").split(","):
+        wish = wish.strip()
+        if wish:
+            wishes.setdefault(gift_id(wish), wish)
+    return list(wishes.values())
+
+
+def multi_wish_search(presents, wishes):
+    """
+    Find the first position of every wish with a single pass over the presents.
+
+    Instead of one linear search per wish (presents x wishes comparisons),
+    each present is looked up once in a dictionary of the wishes that
+    haven't been found yet, so the cost is about presents + wishes.
+
+    Parameters:
+        presents (list or PresentList): List of presents
+        wishes (list[str]): The gifts we're searching for
+
+    Returns:
+        MultiWishResult: First position of each wish and presents checked
+    """
+    # Gift id -> wish, for the wishes not found yet
+    pending = {}
+    for wish in wishes:
+        pending.setdefault(gift_id(wish), wish)
+    wishes = list(pending.values())
+    first_index = dict.fromkeys(wishes, -1)
+
+    if isinstance(presents, PresentList):
+        # Every present with the same gift has the same code, so we only need
+        # the first position of each code that is one of the wishes.
+        for code, gift in enumerate(presents.vocabulary):
+            wish = pending.get(gift_id(gift))
+            if wish is None:
+                continue
+            index = presents.codes.find(bytes([code]))
+            if index != -1 and (first_index[wish] == -1 or index < first_index[wish]):
+                first_index[wish] = index
+        found = [index for index in first_index.values() if index != -1]
+        all_found = len(found) == len(wishes)
+        comparisons = max(found) + 1 if all_found and found else len(presents)
+    elif isinstance(presents, VirtualPresents):
+        # Computed presents can't be scanned one by one; each find is quick
+        for wish in wishes:
+            first_index[wish] = presents.find(wish)
+        found = [index for index in first_index.values() if index != -1]
+        all_found = len(found) == len(wishes)
+        comparisons = max(found) + 1 if all_found and found else len(presents)
+    else:
+        comparisons = len(presents)
+        for i, gift in enumerate(presents):
+            wish = pending.pop(gift_id(gift), None)
+            if wish is None:
+                continue
+            first_index[wish] = i
+            if not pending:
+                comparisons = i + 1
+                break
+
+    return MultiWishResult(wishes, first_index, comparisons)
+
+
+def create_multi_wish_tree(presents, result):
+    """
+    Draw the tree with the first match of every wish in its own color.
+
+    Presents the pass checked are gray and the rest red. Lists longer than
+    TREE_WINDOW only show the matches.
+
+    Parameters:
+        presents (list or PresentList): List of presents
+        result (MultiWishResult): The result of multi_wish_search
+
+    Returns:
+        str: HTML string for the tree and presents display (styled by TREE_CSS)
+    """
+    # Position -> color slot of the wish found there
+    slots = {
+        index: slot % len(WISH_COLORS)
+        for slot, wish in enumerate(result.wishes)
+        if (index := result.first_index[wish]) != -1
+    }
+
+    def state(index):
+        if index in slots:
+            return f"{BOX_FOUND} wish-{slots[index]}"
+        return BOX_CHECKED if index < result.comparisons else BOX_UNCHECKED
+
+    if len(presents) <= TREE_WINDOW:
+        presents_html = ''.join(
+            render_present_box(gift, i, state(i)) for i, gift in enumerate(presents)
+        )
+    else:
+        boxes = '<span class="present-gap">...</span>'.join(
+            render_present_box(presents[i], i, state(i)) for i in sorted(slots)
+        )
+        presents_html = (
+            f'<p class="window-summary">Showing only the matches. The pass checked '
+            f'{result.comparisons:,} of {len(presents):,} presents.</p>'
+            f'<div class="presents">{boxes}</div>'
+        )
+    return wrap_tree(presents_html, "Presents under the tree (every wish found in one pass):")
+
+
+def format_multi_wish_result(result, num_presents):
+    """
+    Describe a multi-wish search in Markdown.
+    """
+    lines = [
+        "| Wish | First position |",
+        "|---|---:|",
+    ]
+    for wish in result.wishes:
+        index = result.first_index[wish]
+        lines.append(f"| {wish} | {f'[{index}]' if index != -1 else 'not under the tree'} |")
+    one_by_one = sum(
+        index + 1 if index != -1 else num_presents for index in result.first_index.values()
+    )
+    return (
+        f"One pass checked **{result.comparisons:,}** of {num_presents:,} presents to look for "
+        f"{len(result.wishes)} wish(es). Searching for them one at a time would take "
+        f"**{one_by_one:,}** comparisons.\n\n" + "\n".join(lines)
+    )
@@ -0,0 +1,168 @@
+"""
+Load generator for the Christmas Linear Search Game.
+
+Simulates many students playing at the same time against a running copy
+of the app and reports, for each event handler, how many calls it served
+and how long they took (p50 / p95 / p99 latency).
+
+Usage:
+    python app.py                      # in one terminal
+    python loadtest.py --sessions 300  # in another
+
+Every simulated session is its own gradio_client.Client, so each one has
+its own game state on the server, just like a separate browser tab.
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from gradio_client import Client
+
+WISHES = ["Book", "Lego Set", "Basketball", "Headphones", "Bike", "Puzzle"]
+
+
+class LatencyRecorder:
+    """
+    Collects call latencies per handler from many threads.
+
+    Attributes:
+        latencies (dict[str, list[float]]): Seconds taken by each call, per handler.
+        errors (dict[str, int]): Number of failed calls, per handler.
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def call(self, client, api_name, *args):
+        """
+        Call one handler and record how long it took.
+
+        Parameters:
+            client (Client): The session to call it on.
+            api_name (str): Handler endpoint, e.g. "/handle_step".
+            *args: Inputs for the handler.
+
+        Returns:
+            The handler's outputs, or None if the call failed.
+        """
+        start = time.perf_counter()
+        try:
+            result = client.predict(*args, api_name=api_name)
+        except Exception:
+            self.record_error(api_name)
+            return None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[api_name].append(elapsed)
+        return result
+
+    def record_error(self, api_name):
+        """
+        Count one failed call for a handler.
+        """
+        with self._lock:
+            self.errors[api_name] += 1
+
+
+def play_one_game(url, recorder, max_steps, reset_chance):
+    """
+    Play one full game as a simulated student.
+
+    Saves a wish, goes to sleep, wakes up, starts the search and then clicks
+    Step until the search finishes (sometimes clicking Reset on the way).
+
+    Parameters:
+        url (str): Address of the running app.
+        recorder (LatencyRecorder): Where to record call latencies.
+        max_steps (int): Stop clicking Step after this many clicks.
+        reset_chance (float): Chance of clicking Reset after each step.
+    """
+    try:
+        client = Client(url, verbose=False)
+    except Exception:
+        recorder.record_error("/connect")
+        return
+    wish = random.choice(WISHES)
+
+    # Stage 1 -> 2 -> 3 -> (presents) -> 4 (search)
+    for _ in range(4):
+        recorder.call(client, "/handle_advance", wish)
+
+    for _ in range(max_steps):
+        result = recorder.call(client, "/handle_step")
+        if result is None:
+            return
+        # The story card goes back to the welcome text once the search is
+        # finished and Step ("Play again") restarts the game.
+        if isinstance(result[0], str) and result[0].startswith("**Welcome"):
+            return
+        if "Found it!" in str(result[0]) or "Not found" in str(result[0]):
+            return
+        if random.random() < reset_chance:
+            recorder.call(client, "/handle_reset")
+
+
+def percentile(values, pct):
+    """
+    Return the pct-th percentile (1-99) of a list of numbers.
+    """
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def print_report(recorder, elapsed):
+    """
+    Print throughput and latency percentiles for every handler.
+
+    Parameters:
+        recorder (LatencyRecorder): The recorded calls.
+        elapsed (float): Wall-clock seconds for the whole run.
+    """
+    total_calls = sum(len(values) for values in recorder.latencies.values())
+    print(f"\n{total_calls} calls in {elapsed:.1f}s "
+          f"({total_calls / elapsed:.1f} calls/s overall)\n")
+    print(f"{'handler':<18}{'calls':>8}{'errors':>8}{'calls/s':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for api_name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = recorder.latencies.get(api_name, [])
+        errors = recorder.errors.get(api_name, 0)
+        if values:
+            p50, p95, p99 = (percentile(values, pct) * 1000 for pct in (50, 95, 99))
+        else:
+            p50 = p95 = p99 = float("nan")
+        print(f"{api_name:<18}{len(values):>8}{errors:>8}{len(values) / elapsed:>10.1f}"
+              f"{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Christmas Linear Search Game.")
+    parser.add_argument("--url", default="http://127.0.0.1:7860/",
+                        help="address of the running app")
+    parser.add_argument("--sessions", type=int, default=100,
+                        help="how many games to play in total")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="how many games to play at the same time")
+    parser.add_argument("--max-steps", type=int, default=20,
+                        help="most Step clicks per game")
+    parser.add_argument("--reset-chance", type=float, default=0.05,
+                        help="chance of clicking Reset after each step")
+    args = parser.parse_args()
+
+    recorder = LatencyRecorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.sessions):
+            pool.submit(play_one_game, args.url, recorder, args.max_steps, args.reset_chance)
+    print_report(recorder, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+Built-in metrics for the Christmas Linear Search Game.
+
+Records, for every event handler:
+    - how long each call took (latency histogram)
+    - how many bytes each response had (size histogram)
+and for the whole app:
+    - how many browser sessions were opened, and how many are open now
+    - how many searches ran and how many comparisons they needed
+
+render_prometheus() returns everything in the Prometheus text format;
+app.py serves it on /metrics.
+
+Optional profiling of slow requests (all off unless set):
+    - SANTA_PROFILE_SAMPLE_RATE: fraction of handler calls to profile (e.g. 0.05)
+    - SANTA_PROFILE_SLOW_MS: keep the profile only if the call took longer than this
+    - SANTA_PROFILE_DIR: where to write the .prof files (default: profiles/)
+Open a saved profile with: python -m pstats profiles/<file>.prof
+Async handlers hand their work to a thread pool (see offload.py), which
+profiles it there the same way.
+"""
+
+import cProfile
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("SANTA_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.environ.get("SANTA_PROFILE_SLOW_MS", "100"))
+PROFILE_DIR = Path(os.environ.get("SANTA_PROFILE_DIR", "profiles"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COMPARISON_BUCKETS = (1, 5, 10, 100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Counter:
+    """
+    A number that only goes up, optionally split by labels.
+
+    Attributes:
+        name (str): Metric name, e.g. "santa_searches_total".
+        help_text (str): One-line description for /metrics.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """
+    A number that can go up and down (e.g. sessions open right now).
+    """
+
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """
+    Counts observations in buckets, optionally split by labels.
+
+    Attributes:
+        name (str): Metric name, e.g. "santa_handler_latency_seconds".
+        help_text (str): One-line description for /metrics.
+        buckets (tuple[float]): Upper bounds of the buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, counts in self._values.items():
+                # Prometheus buckets are cumulative; observe() already counts
+                # every bucket a value fits in.
+                for bound, count in zip(self.buckets, counts):
+                    result.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), count))
+                result.append((f"{self.name}_bucket", key + (("le", "+Inf"),), counts[-2]))
+                result.append((f"{self.name}_count", key, counts[-2]))
+                result.append((f"{self.name}_sum", key, counts[-1]))
+        return result
+
+
+HANDLER_LATENCY = Histogram(
+    "santa_handler_latency_seconds", "Time taken by each event handler call.", LATENCY_BUCKETS
+)
+RESPONSE_BYTES = Histogram(
+    "santa_response_bytes", "Size of the text and HTML each handler call sends back.", SIZE_BUCKETS
+)
+HANDLER_ERRORS = Counter("santa_handler_errors_total", "Handler calls that raised an exception.")
+SESSIONS_STARTED = Counter("santa_sessions_started_total", "Browser sessions opened.")
+SESSIONS_ACTIVE = Gauge("santa_sessions_active", "Browser sessions open right now.")
+SESSIONS_ACTIVE.set(0)
+SEARCHES = Counter("santa_searches_total", "Searches started, by search method.")
+SEARCH_COMPARISONS = Counter(
+    "santa_search_comparisons_total", "Comparisons needed by all searches, by search method."
+)
+ABANDONED_WORK = Gauge(
+    "santa_abandoned_work",
+    "Pooled handler work still running after its caller gave up (timeout or closed tab), by pool.",
+)
+SEARCH_COMPARISONS_PER_SEARCH = Histogram(
+    "santa_search_comparisons", "Comparisons needed by each search.", COMPARISON_BUCKETS
+)
+
+ALL_METRICS = [
+    HANDLER_LATENCY,
+    RESPONSE_BYTES,
+    HANDLER_ERRORS,
+    SESSIONS_STARTED,
+    SESSIONS_ACTIVE,
+    SEARCHES,
+    SEARCH_COMPARISONS,
+    SEARCH_COMPARISONS_PER_SEARCH,
+    ABANDONED_WORK,
+]
+
+
+def response_size(value, top_level=True):
+    """
+    Count the bytes of text/HTML/JSON in a handler's outputs.
+
+    Lists, tuples inside the outputs and other objects are game state kept
+    on the server, so they are not counted. Dicts (updates and tree patches)
+    count their text, which is close to their JSON size without the cost
+    of encoding them on every call.
+    """
+    if isinstance(value, str):
+        # The markup is plain ASCII (one byte per character); only story
+        # text with emoji needs encoding to count its bytes
+        return len(value) if value.isascii() else len(value.encode("utf-8"))
+    if isinstance(value, tuple) and top_level:
+        return sum(response_size(item, top_level=False) for item in value)
+    if isinstance(value, dict):
+        if value.get("__type__") == "update":
+            return response_size(value.get("value"), top_level=False)
+        return sum(len(key) + response_size(item, top_level=False) for key, item in value.items())
+    return 0
+
+
+def record_search(trace):
+    """
+    Record one search (a SearchTrace from game_core).
+    """
+    record_comparisons(trace.engine, trace.comparisons)
+
+
+def record_comparisons(engine, comparisons):
+    """
+    Record one search by name and how many comparisons it needed.
+    """
+    SEARCHES.inc(engine=engine)
+    SEARCH_COMPARISONS.inc(comparisons, engine=engine)
+    SEARCH_COMPARISONS_PER_SEARCH.observe(comparisons, engine=engine)
+
+
+# Ids of the browser sessions open right now. Closing a session we never
+# saw open (e.g. an API client that skipped the page load) is ignored, so
+# the gauge can't go below zero.
+_open_sessions = set()
+_sessions_lock = threading.Lock()
+
+
+def session_opened(session_id):
+    with _sessions_lock:
+        if session_id in _open_sessions:
+            return
+        _open_sessions.add(session_id)
+        SESSIONS_ACTIVE.set(len(_open_sessions))
+    SESSIONS_STARTED.inc()
+
+
+def session_closed(session_id):
+    with _sessions_lock:
+        _open_sessions.discard(session_id)
+        SESSIONS_ACTIVE.set(len(_open_sessions))
+
+
+# Only one request is profiled at a time (cProfile can't profile two
+# threads' requests at once).
+_profile_lock = threading.Lock()
+
+
+def call_maybe_profiled(handler_name, call):
+    """
+    Run call(), profiling it now and then (see SANTA_PROFILE_SAMPLE_RATE).
+
+    Returns:
+        (result, elapsed seconds)
+    """
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE \
+            or not _profile_lock.acquire(blocking=False):
+        start = time.perf_counter()
+        result = call()
+        return result, time.perf_counter() - start
+
+    try:
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        result = profiler.runcall(call)
+        elapsed = time.perf_counter() - start
+        if elapsed * 1000 >= PROFILE_SLOW_MS:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(PROFILE_DIR / f"{handler_name}-{time.strftime('%Y%m%d-%H%M%S')}-{elapsed * 1000:.0f}ms.prof")
+        return result, elapsed
+    finally:
+        _profile_lock.release()
+
+
+def instrument(handler_name):
+    """
+    Decorator that records latency and response size for an event handler.
+
+    Works for normal and async handlers, and for (async) generator handlers
+    like autoplay, where every yielded frame is counted as one response.
+
+    Parameters:
+        handler_name (str): Name used in the metric labels, e.g. "handle_step".
+    """
+    def decorator(handler):
+        if inspect.isgeneratorfunction(handler):
+            @functools.wraps(handler)
+            def generator_wrapper(*args, **kwargs):
+                frames = handler(*args, **kwargs)
+                while True:
+                    try:
+                        frame, elapsed = call_maybe_profiled(handler_name, lambda: next(frames))
+                    except StopIteration:
+                        return
+                    except Exception:
+                        HANDLER_ERRORS.inc(handler=handler_name)
+                        raise
+                    HANDLER_LATENCY.observe(elapsed, handler=handler_name)
+                    RESPONSE_BYTES.observe(response_size(frame), handler=handler_name)
+                    yield frame
+            return generator_wrapper
+
+        if inspect.isasyncgenfunction(handler):
+            @functools.wraps(handler)
+            async def async_generator_wrapper(*args, **kwargs):
+                frames = handler(*args, **kwargs)
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        frame = await frames.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    except Exception:
+                        HANDLER_ERRORS.inc(handler=handler_name)
+                        raise
+                    HANDLER_LATENCY.observe(time.perf_counter() - start, handler=handler_name)
+                    RESPONSE_BYTES.observe(response_size(frame), handler=handler_name)
+                    yield frame
+            return async_generator_wrapper
+
+        if inspect.iscoroutinefunction(handler):
+            # Async handlers do their work in a thread pool, and cProfile only
+            # sees the thread it runs in, so offload.run_off_loop profiles the
+            # work there; this only times the whole call.
+            @functools.wraps(handler)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = await handler(*args, **kwargs)
+                except Exception:
+                    HANDLER_ERRORS.inc(handler=handler_name)
+                    raise
+                HANDLER_LATENCY.observe(time.perf_counter() - start, handler=handler_name)
+                RESPONSE_BYTES.observe(response_size(result), handler=handler_name)
+                return result
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            try:
+                result, elapsed = call_maybe_profiled(handler_name, lambda: handler(*args, **kwargs))
+            except Exception:
+                HANDLER_ERRORS.inc(handler=handler_name)
+                raise
+            HANDLER_LATENCY.observe(elapsed, handler=handler_name)
+            RESPONSE_BYTES.observe(response_size(result), handler=handler_name)
+            return result
+        return wrapper
+    return decorator
+
+
+def render_prometheus():
+    """
+    Return every metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in ALL_METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
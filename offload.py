@@ -0,0 +1,150 @@
+"""
+Run handler work off the event loop, in bounded thread pools.
+
+Async handlers in app.py hand their work to one of two pools, so the web
+server's event loop only waits and never renders:
+    - "heavy": dealing the presents and running a whole search, which can
+      take seconds for millions of presents
+    - "fast": stepping, resetting and other small renders
+A click on Step therefore never waits behind somebody's huge list; the
+two kinds of work only share the CPU.
+
+Every call has a time limit, and when a browser tab closes (app.py's
+unload handler calls cancel_session) that session's calls are cancelled.
+Either way, work still waiting for a thread is dropped, but work already
+running keeps its thread until it finishes and its result is thrown away
+(Python threads can't be stopped). So that one session can't fill the
+heavy pool with such work, each session may only have
+SANTA_HEAVY_PER_SESSION heavy calls in the pool at a time; another heavy
+click from it is turned away as busy straight away. santa_abandoned_work
+on /metrics shows how much given-up work is still running.
+
+Settings (optional):
+    - SANTA_HEAVY_WORKERS: threads for dealing and searching (default: 2)
+    - SANTA_FAST_WORKERS: threads for steps and small renders (default: 4)
+    - SANTA_HANDLER_TIMEOUT: seconds before a call gives up (default: 30)
+    - SANTA_HEAVY_PER_SESSION: heavy calls one session may have in the
+      pool, running or given up (default: 1)
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+HEAVY_WORKERS = int(os.environ.get("SANTA_HEAVY_WORKERS", "2"))
+FAST_WORKERS = int(os.environ.get("SANTA_FAST_WORKERS", "4"))
+HANDLER_TIMEOUT = float(os.environ.get("SANTA_HANDLER_TIMEOUT", "30"))
+HEAVY_PER_SESSION = int(os.environ.get("SANTA_HEAVY_PER_SESSION", "1"))
+
+POOLS = {
+    "heavy": ThreadPoolExecutor(max_workers=HEAVY_WORKERS, thread_name_prefix="santa-heavy"),
+    "fast": ThreadPoolExecutor(max_workers=FAST_WORKERS, thread_name_prefix="santa-fast"),
+}
+
+# Session id -> {asyncio task: its event loop} for the calls running now
+_running = {}
+# Session id -> how many of its calls are in the heavy pool (waiting or
+# running, including ones whose caller already gave up)
+_heavy_calls = {}
+# Pool futures still running after their caller gave up
+_abandoned = set()
+_running_lock = threading.Lock()
+
+
+class SessionBusy(TimeoutError):
+    """
+    The session already has as many heavy calls in the pool as it may have.
+    """
+
+
+def _work_done(session_id, pool, future):
+    """
+    Called (in the pool thread) when a call's work has finished or was dropped.
+    """
+    with _running_lock:
+        if pool == "heavy" and session_id is not None:
+            left = _heavy_calls.get(session_id, 0) - 1
+            if left > 0:
+                _heavy_calls[session_id] = left
+            else:
+                _heavy_calls.pop(session_id, None)
+        if future in _abandoned:
+            _abandoned.discard(future)
+            metrics.ABANDONED_WORK.dec(pool=pool)
+
+
+async def run_off_loop(session_id, pool, function, *args, timeout=None, name=None):
+    """
+    Run function(*args) in a thread pool and wait for it without blocking the loop.
+
+    Parameters:
+        session_id (str or None): The browser session, so its calls can be
+            cancelled when it closes (None: never cancelled)
+        pool (str): "heavy" or "fast" (see POOLS)
+        function (callable): The work to do
+        timeout (float or None): Seconds to wait (None means HANDLER_TIMEOUT)
+        name (str or None): Handler name for the profiles saved in the pool
+            thread (see metrics.call_maybe_profiled; None: the function's name)
+
+    Returns:
+        Whatever function returned.
+
+    Raises:
+        TimeoutError: The work took longer than the timeout.
+        SessionBusy: The session already has HEAVY_PER_SESSION heavy calls
+            in the pool (a TimeoutError too, so callers can treat it the same).
+        asyncio.CancelledError: The session closed (or the event was cancelled).
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    if session_id is not None:
+        with _running_lock:
+            if pool == "heavy":
+                if _heavy_calls.get(session_id, 0) >= HEAVY_PER_SESSION:
+                    raise SessionBusy(f"Session already has {HEAVY_PER_SESSION} heavy call(s) running")
+                _heavy_calls[session_id] = _heavy_calls.get(session_id, 0) + 1
+            _running.setdefault(session_id, {})[task] = loop
+    try:
+        call = functools.partial(function, *args)
+        work = POOLS[pool].submit(
+            lambda: metrics.call_maybe_profiled(name or function.__name__, call)[0]
+        )
+        work.add_done_callback(functools.partial(_work_done, session_id, pool))
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(work), HANDLER_TIMEOUT if timeout is None else timeout
+            )
+        except (TimeoutError, asyncio.CancelledError):
+            # Work still waiting for a thread is dropped; work already
+            # running can't be stopped, so it is counted until it finishes
+            if not work.cancel():
+                with _running_lock:
+                    if not work.done():
+                        _abandoned.add(work)
+                        metrics.ABANDONED_WORK.inc(pool=pool)
+            raise
+    finally:
+        if session_id is not None:
+            with _running_lock:
+                tasks = _running.get(session_id, {})
+                tasks.pop(task, None)
+                if not tasks:
+                    _running.pop(session_id, None)
+
+
+def cancel_session(session_id):
+    """
+    Cancel every call still running for a session (safe from any thread).
+
+    Returns:
+        int: How many calls were cancelled
+    """
+    with _running_lock:
+        tasks = _running.pop(session_id, {})
+    for task, loop in tasks.items():
+        loop.call_soon_threadsafe(task.cancel)
+    return len(tasks)
@@ -0,0 +1,327 @@
+"""
+Parallel chunked linear search for very large lists of presents.
+
+Importing this module adds a "Parallel chunked search" engine. It splits
+the list into chunks and lets a pool of worker processes scan them at the
+same time:
+    - the presents are put in shared memory once (one byte per present),
+      so the workers read the same bytes instead of each getting a pickled
+      copy of the list
+    - every worker scans its chunk with a compiled regular expression,
+      which runs in C over the raw bytes
+    - the answer is the first match in the lowest chunk that has one, so it
+      is always the same index linear search would find
+    - as soon as some chunk finds a match, chunks after it that haven't
+      started are cancelled and the ones already running stop early
+
+The story card shows which worker scanned which chunk and how far it got.
+
+Settings (optional):
+    - SANTA_SEARCH_WORKERS: number of worker processes (default: one per CPU)
+
+Lists shorter than PARALLEL_MIN_PRESENTS are scanned chunk by chunk in
+this process, since starting the workers would take longer than the search.
+"""
+
+import multiprocessing
+import os
+import re
+import struct
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker, shared_memory
+
+from game_core import EngineRun, PresentList, gift_id, register_engine
+
+PARALLEL_SEARCH = "Parallel chunked search"
+
+SEARCH_WORKERS = int(os.environ.get("SANTA_SEARCH_WORKERS", "0")) or os.cpu_count() or 1
+
+# Smaller lists are searched in this process
+PARALLEL_MIN_PRESENTS = 100_000
+
+# Chunk sizes: a few chunks per worker, so a worker that finishes early can
+# pick up another one, but never tiny chunks
+CHUNKS_PER_WORKER = 4
+MIN_CHUNK_SIZE = 65_536
+
+# Workers look at the "stop" flag after every block of this many presents
+SCAN_BLOCK = 1 << 20
+
+# The stop flag lives in 4 bytes right after the presents in shared memory
+# and holds the lowest chunk number with a match so far.
+STOP_FLAG = struct.Struct("I")
+NO_MATCH_YET = 0xFFFFFFFF
+
+# What happened to one chunk:
+#   - chunk: chunk number (0 = the start of the list)
+#   - worker: who scanned it ("Worker 1", "Worker 2", ... or "This process")
+#   - start, end: the chunk covers presents [start, end)
+#   - scanned: how many presents of the chunk were looked at
+#   - found_index: first match in the chunk (-1 if none was found)
+#   - result: "match", "no match", "stopped early" or "cancelled"
+ChunkResult = namedtuple(
+    "ChunkResult", ["chunk", "worker", "start", "end", "scanned", "found_index", "result"]
+)
+
+
+def plan_chunks(num_presents, workers):
+    """
+    Split [0, num_presents) into chunks for the workers.
+
+    Returns:
+        list[tuple[int, int]]: (start, end) of every chunk, in order
+    """
+    if num_presents == 0:
+        return []
+    most_chunks = -(-num_presents // MIN_CHUNK_SIZE)
+    num_chunks = max(1, min(workers * CHUNKS_PER_WORKER, most_chunks))
+    bounds = [chunk * num_presents // num_chunks for chunk in range(num_chunks + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def encode_presents(presents, wish):
+    """
+    Turn the presents into one byte per present and find the wish's byte(s).
+
+    A PresentList already is one byte per present. A normal list is turned
+    into 1 for presents matching the wish and 0 for the rest (which is a
+    full pass over the list, so it counts as setup work).
+
+    Returns:
+        (codes, target_codes, setup_operations)
+    """
+    target = gift_id(wish)
+    if isinstance(presents, PresentList):
+        target_codes = bytes(
+            code for code, gift in enumerate(presents.vocabulary) if gift_id(gift) == target
+        )
+        return presents.codes, target_codes, 0
+    codes = bytes(gift_id(gift) == target for gift in presents)
+    return codes, b"\x01", len(presents)
+
+
+def _scan(buffer, chunk, start, end, pattern, stopped=None):
+    """
+    Find the first byte matching pattern in buffer[start:end].
+
+    Parameters:
+        buffer: The presents, one byte each (bytes or shared memory)
+        chunk (int): This chunk's number
+        start, end (int): The chunk covers presents [start, end)
+        pattern (re.Pattern): Matches any of the wish's bytes
+        stopped (callable or None): Returns True once an earlier chunk has
+            a match, so this one can stop
+
+    Returns:
+        (found_index, scanned, result)
+    """
+    for block_start in range(start, end, SCAN_BLOCK):
+        if stopped is not None and stopped(chunk):
+            return -1, block_start - start, "stopped early"
+        block_end = min(end, block_start + SCAN_BLOCK)
+        match = pattern.search(buffer, block_start, block_end)
+        if match is not None:
+            found_index = match.start()
+            # The match keeps a reference to the buffer; drop it so shared
+            # memory can be closed afterwards
+            del match
+            return found_index, found_index - start + 1, "match"
+    return -1, end - start, "no match"
+
+
+def _scan_shared_chunk(memory_name, num_presents, chunk, start, end, pattern_bytes):
+    """
+    Scan one chunk in a worker process (see _scan).
+
+    Returns:
+        (chunk, process id, found_index, scanned, result)
+    """
+    memory = shared_memory.SharedMemory(name=memory_name)
+    buffer = memory.buf
+    try:
+        def stopped(chunk):
+            return STOP_FLAG.unpack_from(buffer, num_presents)[0] < chunk
+
+        found_index, scanned, result = _scan(
+            buffer, chunk, start, end, re.compile(pattern_bytes), stopped
+        )
+        return chunk, os.getpid(), found_index, scanned, result
+    finally:
+        del buffer
+        memory.close()
+
+
+def _init_worker():
+    """
+    Runs once in every worker process.
+
+    The main process creates and unlinks the shared memory. Attaching to it
+    in a worker must not register it with the resource tracker as well
+    (Python before 3.13 always does), or the tracker reports it as leaked
+    or unlinks it twice.
+    """
+    register, unregister = resource_tracker.register, resource_tracker.unregister
+
+    def skip_shared_memory(function):
+        def wrapper(name, rtype):
+            if rtype != "shared_memory":
+                function(name, rtype)
+        return wrapper
+
+    resource_tracker.register = skip_shared_memory(register)
+    resource_tracker.unregister = skip_shared_memory(unregister)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Start the worker processes the first time they are needed.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" starts clean processes, which is safe even though the
+            # web server that calls us runs many threads
+            _pool = ProcessPoolExecutor(
+                max_workers=SEARCH_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def scan_in_process(codes, chunks, pattern):
+    """
+    Scan the chunks one after another in this process.
+
+    Returns:
+        list[ChunkResult]
+    """
+    results = []
+    found = False
+    for chunk, (start, end) in enumerate(chunks):
+        if found:
+            results.append(ChunkResult(chunk, "This process", start, end, 0, -1, "cancelled"))
+            continue
+        found_index, scanned, result = _scan(codes, chunk, start, end, pattern)
+        results.append(ChunkResult(chunk, "This process", start, end, scanned, found_index, result))
+        found = found_index != -1
+    return results
+
+
+def scan_in_workers(codes, chunks, pattern_bytes):
+    """
+    Scan the chunks at the same time in the worker processes.
+
+    The presents are copied into shared memory once; each worker attaches
+    to it by name. Once chunk k has a match, chunks after k are cancelled
+    (or stop early), and we only wait for chunks before k, since one of
+    them could still hold an earlier match.
+
+    Returns:
+        list[ChunkResult]
+    """
+    num_presents = len(codes)
+    memory = shared_memory.SharedMemory(create=True, size=num_presents + STOP_FLAG.size)
+    try:
+        memory.buf[:num_presents] = codes
+        STOP_FLAG.pack_into(memory.buf, num_presents, NO_MATCH_YET)
+
+        pool = get_pool()
+        futures = {
+            pool.submit(_scan_shared_chunk, memory.name, num_presents, chunk, start, end,
+                        pattern_bytes): chunk
+            for chunk, (start, end) in enumerate(chunks)
+        }
+        first_match_chunk = NO_MATCH_YET
+        finished = {}
+        cancelled = set()
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                chunk, pid, found_index, scanned, result = future.result()
+                finished[chunk] = (pid, found_index, scanned, result)
+                if found_index != -1 and chunk < first_match_chunk:
+                    first_match_chunk = chunk
+                    STOP_FLAG.pack_into(memory.buf, num_presents, chunk)
+                    for other in pending:
+                        if futures[other] > chunk and other.cancel():
+                            cancelled.add(futures[other])
+            # Chunks after the first match don't matter any more
+            pending = {future for future in pending if futures[future] < first_match_chunk}
+
+        # Number the workers in the order their process ids first appear
+        worker_names = {}
+        results = []
+        for chunk, (start, end) in enumerate(chunks):
+            if chunk not in finished:
+                # Either cancelled before it started, or still running when
+                # we stopped waiting (it then stops at its next block)
+                result = "cancelled" if chunk in cancelled else "stopped early"
+                results.append(ChunkResult(chunk, "-", start, end, 0, -1, result))
+                continue
+            pid, found_index, scanned, result = finished[chunk]
+            worker = worker_names.setdefault(pid, f"Worker {len(worker_names) + 1}")
+            results.append(ChunkResult(chunk, worker, start, end, scanned, found_index, result))
+        return results
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def format_chunk_table(results):
+    """
+    Format what happened to every chunk as a Markdown table.
+    """
+    lines = [
+        "| Chunk | Presents | Scanned by | Presents checked | Result |",
+        "|---:|---|---|---:|---|",
+    ]
+    for row in results:
+        result = f"match at [{row.found_index}]" if row.result == "match" else row.result
+        lines.append(
+            f"| {row.chunk} | [{row.start}] to [{row.end - 1}] | {row.worker} | "
+            f"{row.scanned:,} | {result} |"
+        )
+    return "\n".join(lines)
+
+
+@register_engine(
+    PARALLEL_SEARCH,
+    "Splits the presents into chunks and lets several helpers check their chunks at the "
+    "same time; the first match in the earliest chunk wins."
+)
+def parallel_chunked_search(presents, wish):
+    num_presents = len(presents)
+    codes, target_codes, setup_operations = encode_presents(presents, wish)
+    chunks = plan_chunks(num_presents, SEARCH_WORKERS)
+
+    if not target_codes:
+        # No present has this name, so nothing can match
+        results = [ChunkResult(chunk, "-", start, end, 0, -1, "no match")
+                   for chunk, (start, end) in enumerate(chunks)]
+    else:
+        pattern_bytes = b"[" + b"".join(re.escape(bytes([code])) for code in target_codes) + b"]"
+        if num_presents < PARALLEL_MIN_PRESENTS or SEARCH_WORKERS == 1:
+            results = scan_in_process(codes, chunks, re.compile(pattern_bytes))
+        else:
+            results = scan_in_workers(codes, chunks, pattern_bytes)
+
+    found_index = next((row.found_index for row in results if row.found_index != -1), -1)
+    comparisons = found_index + 1 if found_index != -1 else num_presents
+    notes = (
+        f"**{len(chunks)} chunk(s)**, "
+        f"{sum(row.scanned for row in results):,} presents checked in total:\n\n"
+        + format_chunk_table(results)
+    )
+    # Stepping through shows the presents in order, like linear search;
+    # the table shows how the work was really shared out.
+    return EngineRun(presents, range(comparisons), found_index, setup_operations,
+                     comparisons, notes)
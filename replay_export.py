@@ -0,0 +1,363 @@
+"""
+Save a search as a replay that plays without the server.
+
+A replay holds the presents, the steps of the search (from a SearchTrace)
+and, for the HTML version, a small JavaScript player. Opening it in a
+browser shows the same yellow (checking), gray (checked) and green (found)
+boxes as the game, with Step, Back, Play and a slider to jump to any step,
+so sharing a search costs the server nothing.
+
+Two formats:
+    - "html": one self-contained web page (the player and the data)
+    - "jsonl": a frame log, one JSON line per step after a header line
+
+Both are written in one pass over the trace. Lists with few different
+gifts (every list the game makes) are stored as one byte per present, so
+a replay of a million presents is a few MB. Lists computed on demand
+(VirtualPresents) are stored as their seed, whatever their length.
+
+Usage:
+    python replay_export.py "Lego Set" --presents 1000000 --seed 42 -o replay.html
+    python replay_export.py "Lego Set" --engine "Sort + binary search" --format jsonl -o replay.jsonl
+"""
+
+import argparse
+import base64
+import html
+import json
+
+import search_engines  # noqa: F401  (adds the other search methods)
+from game_core import (
+    LINEAR_SEARCH,
+    SEARCH_ENGINES,
+    TREE_CSS,
+    TREE_WINDOW,
+    PresentList,
+    VirtualPresents,
+    build_search_trace,
+    layout_title,
+    presents_for_seed,
+)
+
+REPLAY_FORMATS = ("html", "jsonl")
+
+# Gift names are written this many at a time, so a huge list is never
+# turned into one giant JSON string
+WRITE_CHUNK = 65_536
+
+
+def encode_layout(layout):
+    """
+    Store the presents as a vocabulary of gift names and one byte per present.
+
+    Returns:
+        (gifts, codes): gifts is a list of names and codes is bytes, with
+        present i being gifts[codes[i]]. codes is None when there are more
+        than 256 different gifts; then gifts is the whole list.
+    """
+    if isinstance(layout, PresentList):
+        return list(layout.vocabulary), layout.codes
+    codes_by_gift = {}
+    codes = bytearray()
+    for gift in layout:
+        code = codes_by_gift.setdefault(gift, len(codes_by_gift))
+        if code > 255:
+            return list(layout), None
+        codes.append(code)
+    return list(codes_by_gift), bytes(codes)
+
+
+def replay_header(trace):
+    """
+    Everything about the search except the presents and the steps.
+    """
+    return {
+        "format": "santa-replay",
+        "version": 1,
+        "wish": trace.wish,
+        "engine": trace.engine,
+        "num_presents": trace.num_presents,
+        "found_index": trace.found_index,
+        "comparisons": trace.comparisons,
+        "title": layout_title(trace),
+    }
+
+
+def probes_json(trace):
+    """
+    The positions checked at each step, as JSON text.
+
+    Linear-style searches (0, 1, 2, ...) are stored as their range instead of
+    one number per step.
+    """
+    probes = trace.probes
+    if isinstance(probes, range) and probes.step == 1:
+        return json.dumps({"start": probes.start, "stop": probes.stop})
+    return json.dumps(list(probes))
+
+
+def presents_json_chunks(layout):
+    """
+    Yield the "gifts" and "codes" (or "presents") JSON members, a piece at a time.
+
+    VirtualPresents are stored as their seed instead ("gifts" and "virtual"),
+    and the player computes every present the same way they do.
+    """
+    if isinstance(layout, VirtualPresents):
+        virtual = {
+            # As a string: JavaScript numbers can't hold every 64-bit seed
+            "seed": str(layout.seed),
+            "wish_index": layout.wish_index,
+            "start": layout.positions.start,
+            "step": layout.positions.step,
+        }
+        yield f'"gifts": {json.dumps(list(layout.vocabulary))}, "virtual": {json.dumps(virtual)}'
+        return
+    gifts, codes = encode_layout(layout)
+    if codes is not None:
+        yield f'"gifts": {json.dumps(gifts)}, "codes": "'
+        # 3 bytes become 4 base64 characters, so chunks of a multiple of 3
+        # bytes can be encoded on their own
+        chunk = WRITE_CHUNK * 3
+        for start in range(0, len(codes), chunk):
+            yield base64.b64encode(codes[start:start + chunk]).decode("ascii")
+        yield '"'
+        return
+    yield '"presents": ['
+    for start in range(0, len(gifts), WRITE_CHUNK):
+        if start:
+            yield ", "
+        yield json.dumps(gifts[start:start + WRITE_CHUNK])[1:-1]
+    yield "]"
+
+
+def write_replay_jsonl(trace, file):
+    """
+    Write a search as a JSON-lines frame log.
+
+    The first line is the header (see replay_header) with the presents;
+    then there is one line per step: {"step": k, "check": position}, and
+    the last step also has "found": true or false.
+
+    Parameters:
+        trace (SearchTrace): The search to save
+        file: A text file open for writing
+    """
+    header = json.dumps(replay_header(trace))
+    file.write(header[:-1] + ", ")
+    for piece in presents_json_chunks(trace.layout):
+        file.write(piece)
+    file.write("}\n")
+
+    if trace.comparisons == 0:
+        return
+    # Every step but the last, WRITE_CHUNK lines at a time
+    last_step = trace.comparisons - 1
+    for start in range(0, last_step, WRITE_CHUNK):
+        end = min(last_step, start + WRITE_CHUNK)
+        file.write("".join(
+            f'{{"step": {step}, "check": {trace.probes[step]}}}\n' for step in range(start, end)
+        ))
+    found = "true" if trace.found_index != -1 else "false"
+    file.write(f'{{"step": {last_step}, "check": {trace.probes[last_step]}, "found": {found}}}\n')
+
+
+def write_replay_html(trace, file):
+    """
+    Write a search as one web page that replays it (see REPLAY_PLAYER_JS).
+
+    Parameters:
+        trace (SearchTrace): The search to save
+        file: A text file open for writing
+    """
+    title = html.escape(f"{trace.engine} for {trace.wish}")
+    file.write(
+        f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{title}</title>"
+        f"<style>{TREE_CSS}{REPLAY_PAGE_CSS}</style></head><body>\n"
+        f"{REPLAY_PAGE_HTML}\n"
+        '<script id="replay-data" type="application/json">'
+    )
+    header = json.dumps(replay_header(trace))
+    # "<" can't appear in JSON outside strings, and inside them "<"
+    # means the same; this way a gift name can't end the <script> early.
+    file.write(header[:-1].replace("<", "\\u003c") + f', "window": {TREE_WINDOW}, ')
+    file.write(f'"probes": {probes_json(trace)}, ')
+    for piece in presents_json_chunks(trace.layout):
+        file.write(piece.replace("<", "\\u003c"))
+    file.write(f"}}</script>\n<script>{REPLAY_PLAYER_JS}</script>\n</body></html>\n")
+
+
+REPLAY_WRITERS = {"html": write_replay_html, "jsonl": write_replay_jsonl}
+
+
+def write_replay(trace, path, replay_format="html"):
+    """
+    Save a search as a replay file.
+
+    Parameters:
+        trace (SearchTrace): The search to save
+        path (str or Path): Where to write it
+        replay_format (str): "html" or "jsonl"
+    """
+    if replay_format not in REPLAY_WRITERS:
+        raise ValueError(f"Unknown replay format {replay_format!r}; choose from {REPLAY_FORMATS}")
+    with open(path, "w", encoding="utf-8") as file:
+        REPLAY_WRITERS[replay_format](trace, file)
+
+
+# --------------------------------------
+# The replay page
+# --------------------------------------
+
+REPLAY_PAGE_CSS = """
+body { font-family: sans-serif; max-width: 1100px; margin: 20px auto; padding: 0 10px; }
+.replay-controls { display: flex; flex-wrap: wrap; gap: 8px; align-items: center; margin: 10px 0; }
+.replay-controls input[type=range] { flex: 1; min-width: 200px; }
+#replay-status { min-height: 3em; }
+"""
+
+REPLAY_PAGE_HTML = """<h2 id="replay-heading"></h2>
+<div id="replay-status"></div>
+<div class="replay-controls">
+  <button id="replay-reset">Reset</button>
+  <button id="replay-back">&larr; Back</button>
+  <button id="replay-step">Step &rarr;</button>
+  <button id="replay-play">&#9654; Play</button>
+  <input id="replay-slider" type="range" min="0" value="0" step="1">
+  <span id="replay-position"></span>
+</div>
+<div id="replay-tree"></div>"""
+
+# The player works out every box's state from the step number alone, the
+# same way box_state does in game_core.py, and like the game it only draws
+# a window of boxes around the present being checked for long lists.
+REPLAY_PLAYER_JS = r"""
+(function () {
+  const data = JSON.parse(document.getElementById("replay-data").textContent);
+  const n = data.num_presents, total = data.comparisons, W = data.window;
+  let giftAt;
+  if (data.codes !== undefined) {
+    const raw = atob(data.codes);
+    giftAt = i => data.gifts[raw.charCodeAt(i)];
+  } else if (data.virtual !== undefined) {
+    // Computed like VirtualPresents.code_at in game_core.py (SplitMix64)
+    const v = data.virtual, M = (1n << 64n) - 1n, G = 0x9E3779B97F4A7C15n;
+    const seed = BigInt(v.seed), pool = BigInt(data.gifts.length - 1);
+    giftAt = i => {
+      const p = v.start + i * v.step;
+      if (p === v.wish_index) return data.gifts[data.gifts.length - 1];
+      let z = (seed + BigInt(p) * G + G) & M;
+      z = ((z ^ (z >> 30n)) * 0xBF58476D1CE4E5B9n) & M;
+      z = ((z ^ (z >> 27n)) * 0x94D049BB133111EBn) & M;
+      z ^= z >> 31n;
+      return data.gifts[Number((z * pool) >> 64n)];
+    };
+  } else {
+    giftAt = i => data.presents[i];
+  }
+  const linear = !Array.isArray(data.probes);
+  const probeAt = k => linear ? data.probes.start + k : data.probes[k];
+  // For other searches: the step at which each position is first checked
+  const firstStep = new Map();
+  if (!linear) data.probes.forEach((p, k) => { if (!firstStep.has(p)) firstStep.set(p, k); });
+
+  // The search after k presents were checked
+  function frame(k) {
+    const current = k > 0 ? probeAt(k - 1) : -1;
+    const found = (k === total && data.found_index !== -1) ? current : -1;
+    return {k, current, found};
+  }
+  function state(i, f) {
+    if (f.found !== -1 && i === f.found) return "found";
+    if (i === f.current) return "checking";
+    if (linear) return (f.current >= 0 && i >= data.probes.start && i < f.current) ? "checked" : "unchecked";
+    return (firstStep.has(i) && firstStep.get(i) < f.k - 1) ? "checked" : "unchecked";
+  }
+  function box(i, s) {
+    const div = document.createElement("div");
+    div.className = "present " + s;
+    const b = document.createElement("b");
+    b.textContent = "[" + i + "]";
+    div.append(b, giftAt(i));
+    return div;
+  }
+  function draw(k) {
+    const f = frame(k);
+    const tree = document.createElement("div");
+    tree.className = "santa-tree";
+    const title = document.createElement("p");
+    title.className = "presents-title";
+    title.textContent = data.title;
+    const boxes = document.createElement("div");
+    boxes.className = "presents";
+    let start = 0, end = n;
+    if (n > W) {
+      const focus = f.current >= 0 ? f.current : Math.max(data.found_index, 0);
+      start = Math.max(0, Math.min(focus - Math.floor(W / 2), n - W));
+      end = start + W;
+      const summary = document.createElement("p");
+      summary.className = "window-summary";
+      summary.textContent = "Showing presents [" + start + "] to [" + (end - 1) + "] of " + n.toLocaleString() + ".";
+      tree.append(title, summary);
+    } else {
+      tree.append(title);
+    }
+    for (let i = start; i < end; i++) boxes.append(box(i, state(i, f)));
+    if (f.found !== -1 && (f.found < start || f.found >= end)) {
+      const gap = document.createElement("span");
+      gap.className = "present-gap";
+      gap.textContent = "...";
+      boxes.append(gap, box(f.found, "found"));
+    }
+    tree.append(boxes);
+    document.getElementById("replay-tree").replaceChildren(tree);
+
+    let status;
+    if (k === 0) status = "Ready to search for " + data.wish + " with " + data.engine.toLowerCase() + ".";
+    else if (f.found !== -1) status = "Found " + data.wish + " at position [" + f.found + "] after checking " + k + " present(s)!";
+    else if (k === total) status = data.wish + " wasn't there. " + data.engine + " checked " + k + " present(s).";
+    else status = "Checking present [" + f.current + "]: " + giftAt(f.current) + " is not " + data.wish + ".";
+    document.getElementById("replay-status").textContent = status;
+    document.getElementById("replay-position").textContent = "Step " + k + " of " + total;
+    slider.value = k;
+  }
+
+  const slider = document.getElementById("replay-slider");
+  slider.max = total;
+  document.getElementById("replay-heading").textContent = data.engine + " for " + data.wish;
+  let step = 0, timer = null;
+  const go = k => { step = Math.max(0, Math.min(total, k)); draw(step); };
+  const pause = () => { clearInterval(timer); timer = null; };
+  document.getElementById("replay-step").onclick = () => { pause(); go(step + 1); };
+  document.getElementById("replay-back").onclick = () => { pause(); go(step - 1); };
+  document.getElementById("replay-reset").onclick = () => { pause(); go(0); };
+  document.getElementById("replay-play").onclick = () => {
+    if (timer) return pause();
+    timer = setInterval(() => { if (step >= total) pause(); else go(step + 1); }, 500);
+  };
+  slider.oninput = () => { pause(); go(Number(slider.value)); };
+  go(0);
+})();
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Save a search as a replay file.")
+    parser.add_argument("wish", help="the gift to search for")
+    parser.add_argument("--presents", type=int, default=10, help="number of presents (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the presents (default: 0)")
+    parser.add_argument("--engine", default=LINEAR_SEARCH, choices=list(SEARCH_ENGINES),
+                        help="search method (default: linear search)")
+    parser.add_argument("--format", default="html", choices=REPLAY_FORMATS, help="replay format")
+    parser.add_argument("-o", "--output", default="replay.html", help="file to write")
+    args = parser.parse_args()
+
+    presents = presents_for_seed(args.seed, args.presents, args.wish)
+    trace = build_search_trace(presents, args.wish, args.engine)
+    write_replay(trace, args.output, args.format)
+    print(f"Wrote {args.output}: {trace.engine} over {trace.num_presents:,} presents, "
+          f"{trace.comparisons:,} steps.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+More ways for Santa's helper to search the presents.
+
+Linear search is registered in game_core.py; importing this module adds:
+    - Sentinel linear search
+    - Move-to-front and Transpose (self-organizing lists)
+    - Hash index
+    - Sort + binary search
+
+Every engine returns the same EngineRun (see game_core.py), so the app can
+step through any of them with the same yellow/gray/green boxes.
+measure_engine and compare_engines add the numbers: comparisons, setup
+work, memory touched and wall time.
+
+Run this file to see where linear search stops being the best choice:
+    python search_engines.py --sizes 10 1000 100000 --searches 1 10 100
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import namedtuple
+
+from game_core import (
+    LAZY_ENGINES,
+    OTHER_GIFTS,
+    SEARCH_ENGINES,
+    EngineRun,
+    PresentList,
+    VirtualPresents,
+    gift_id,
+    linear_search,
+    normalize_gift,
+    register_engine,
+)
+
+# Measured cost of one engine on one list:
+#   - comparisons: presents checked during the search
+#   - setup_operations: work before the first comparison
+#   - repeat_comparisons: presents checked when searching for the same wish again
+#   - memory_touched: approximate bytes of present data read
+#   - wall_time: seconds for the whole run (setup + search)
+EngineStats = namedtuple(
+    "EngineStats",
+    ["engine", "found_index", "comparisons", "setup_operations", "repeat_comparisons",
+     "memory_touched", "wall_time"],
+)
+
+
+@register_engine(
+    "Sentinel linear search",
+    "Puts your wish at the end of a copy of the list as a 'sentinel', so the loop "
+    "never has to check whether it ran off the end."
+)
+def sentinel_linear_search(presents, wish):
+    target = gift_id(wish)
+    # Copy so we never change the shared list (the copy is the setup cost)
+    items = list(presents)
+    items.append(wish)
+
+    i = 0
+    while gift_id(items[i]) != target:
+        i += 1
+
+    num_presents = len(presents)
+    found_index = i if i < num_presents else -1
+    # When not found, the sentinel itself was one extra comparison
+    comparisons = i + 1
+    return EngineRun(presents, range(min(comparisons, num_presents)), found_index,
+                     num_presents, comparisons)
+
+
+@register_engine(
+    "Move-to-front",
+    "Linear search that moves the present it finds to the front, so asking "
+    "for the same gift again takes one comparison.",
+    lazy=True,
+)
+def move_to_front_search(presents, wish):
+    run = linear_search(presents, wish)
+    repeat = 1 if run.found_index != -1 else len(presents)
+    return run._replace(repeat_comparisons=repeat)
+
+
+@register_engine(
+    "Transpose",
+    "Linear search that swaps the present it finds one place forward, so "
+    "popular gifts slowly drift to the front.",
+    lazy=True,
+)
+def transpose_search(presents, wish):
+    run = linear_search(presents, wish)
+    if run.found_index == -1:
+        repeat = len(presents)
+    else:
+        # After the swap the gift sits one place earlier (or stays at [0])
+        repeat = max(run.found_index, 1)
+    return run._replace(repeat_comparisons=repeat)
+
+
+@register_engine(
+    "Hash index",
+    "Reads every present once to build a dictionary from gift name to "
+    "position, then finds the gift with a single lookup."
+)
+def hash_index_search(presents, wish):
+    index = {}
+    for i, gift in enumerate(presents):
+        # setdefault keeps the first position of each gift
+        index.setdefault(gift_id(gift), i)
+
+    found_index = index.get(gift_id(wish), -1)
+    probes = [found_index] if found_index != -1 else []
+    return EngineRun(presents, probes, found_index, len(presents), 1)
+
+
+@register_engine(
+    "Sort + binary search",
+    "Sorts the presents by name, then keeps halving the part of the list "
+    "where the gift could be."
+)
+def binary_search(presents, wish):
+    num_presents = len(presents)
+    # A stable sort keeps equal gifts in their original order
+    layout = sorted(presents, key=normalize_gift)
+    keys = [normalize_gift(gift) for gift in layout]
+    target = normalize_gift(wish)
+
+    # Keep halving the range [low, high) until we land on the gift
+    probes = []
+    found_index = -1
+    low, high = 0, num_presents
+    while low < high:
+        middle = (low + high) // 2
+        probes.append(middle)
+        if keys[middle] == target:
+            found_index = middle
+            break
+        if keys[middle] < target:
+            low = middle + 1
+        else:
+            high = middle
+
+    # Comparison sort: about n * log2(n) comparisons
+    setup_operations = num_presents * max(1, num_presents.bit_length())
+    return EngineRun(layout, probes, found_index, setup_operations, len(probes))
+
+
+def bytes_per_present(presents):
+    """
+    Approximate bytes read to look at one present.
+    """
+    if isinstance(presents, PresentList):
+        return 1
+    if isinstance(presents, VirtualPresents):
+        # Computed from the position; nothing is read from memory
+        return 0
+    if not presents:
+        return 0
+    # One list slot (a pointer) plus the string it points to
+    return 8 + sys.getsizeof(presents[0])
+
+
+def measure_engine(engine, presents, wish):
+    """
+    Run one engine and measure what it cost.
+
+    Parameters:
+        engine (str): Name of a search engine in SEARCH_ENGINES
+        presents (list or PresentList): List of presents
+        wish (str): The gift we're searching for
+
+    Returns:
+        EngineStats: The measured cost
+    """
+    engine_fn, _ = SEARCH_ENGINES[engine]
+    start = time.perf_counter()
+    run = engine_fn(presents, wish)
+    wall_time = time.perf_counter() - start
+
+    # Engines with setup work read the whole list once
+    items_read = len(run.probes) + (len(presents) if run.setup_operations else 0)
+    return EngineStats(
+        engine,
+        run.found_index,
+        len(run.probes),
+        run.setup_operations,
+        run.repeat_comparisons,
+        items_read * bytes_per_present(presents),
+        wall_time,
+    )
+
+
+def compare_engines(presents, wish):
+    """
+    Measure every registered engine on the same list.
+
+    For VirtualPresents only the engines in LAZY_ENGINES are measured; the
+    others would need the whole list in memory.
+
+    Returns:
+        list[EngineStats]: One entry per engine
+    """
+    engines = [engine for engine in SEARCH_ENGINES
+               if engine in LAZY_ENGINES or not isinstance(presents, VirtualPresents)]
+    return [measure_engine(engine, presents, wish) for engine in engines]
+
+
+def format_engine_table(stats, searches=1):
+    """
+    Format engine measurements as a Markdown table.
+
+    Parameters:
+        stats (list[EngineStats]): Measurements from compare_engines
+        searches (int): How many searches to count the total cost for
+
+    Returns:
+        str: Markdown table
+    """
+    lines = [
+        f"| Search method | Comparisons | Setup work | Same gift again | Total for {searches} search(es) | Memory touched | Time |",
+        "|---|---:|---:|---:|---:|---:|---:|",
+    ]
+    for row in stats:
+        total = total_cost(row, searches)
+        lines.append(
+            f"| {row.engine} | {row.comparisons:,} | {row.setup_operations:,} | "
+            f"{row.repeat_comparisons:,} | {total:,} | {row.memory_touched:,} B | "
+            f"{row.wall_time * 1000:.3f} ms |"
+        )
+    return "\n".join(lines)
+
+
+def total_cost(stats, searches):
+    """
+    Operations needed to search for the same gift `searches` times.
+
+    The first search pays for the setup and its comparisons; every search
+    after that only pays repeat_comparisons.
+    """
+    return stats.setup_operations + stats.comparisons + (searches - 1) * stats.repeat_comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare search engines on growing lists.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--searches", type=int, nargs="+", default=[1, 10, 100, 1_000],
+                        help="numbers of repeated searches to total the cost for")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    wish = "Basketball"
+    for size in args.sizes:
+        # Worst case for linear search: the wish is the very last present
+        presents = [random.choice(OTHER_GIFTS) for _ in range(size)]
+        presents[-1] = wish
+        stats = compare_engines(presents, wish)
+
+        print(f"\n## {size:,} presents\n")
+        print(format_engine_table(stats))
+        cheapest = {
+            searches: min(stats, key=lambda row: total_cost(row, searches)).engine
+            for searches in args.searches
+        }
+        print()
+        for searches, engine in cheapest.items():
+            print(f"- cheapest for {searches:,} search(es) of this gift: {engine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Server-side storage for each player's game (optional).
+
+Normally the app keeps the presents and the precomputed search in
+gr.State, one copy per browser tab, for as long as Gradio keeps the tab's
+state. With a session store, gr.State only holds a short key and the game
+data lives here instead, with limits for busy classrooms:
+    - max_entries: the least recently used games are dropped first (LRU)
+    - ttl: games nobody touched for this many seconds are dropped
+
+Two stores are available:
+    - "memory": a dictionary in this process (fast, lost on restart)
+    - "sqlite": a local SQLite file (shared by several app processes, and
+      keeps the data out of the web server's memory)
+
+Settings (app.py):
+    - SANTA_SESSION_STORE: "memory" or "sqlite" (default: off)
+    - SANTA_SESSION_DB: SQLite file (default: sessions.sqlite3)
+    - SANTA_SESSION_TTL: seconds before an untouched game is dropped (default: 3600)
+    - SANTA_SESSION_MAX: most games to keep (default: 1000)
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryStore:
+    """
+    Game data in a dictionary, with LRU and TTL eviction.
+
+    Entries are kept in least-recently-used order. Every get or put moves
+    an entry to the end and restarts its TTL, so the oldest entries (the
+    first to expire) are always at the front.
+
+    Attributes:
+        max_entries (int): Most entries to keep.
+        ttl (float): Seconds an entry lives after it was last used.
+        evictions (int): Entries dropped so far (expired or over the limit).
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        # key -> (expires at, value)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the value stored under key, or None if it expired or was evicted.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """
+        Store value under key, dropping expired and least recently used entries.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while self._entries:
+                oldest_key, (expires, _) = next(iter(self._entries.items()))
+                if expires > now and len(self._entries) <= self.max_entries:
+                    break
+                del self._entries[oldest_key]
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """
+    Game data in a local SQLite file, with LRU and TTL eviction.
+
+    Values are pickled. Every get or put updates the entry's last-used time;
+    put then deletes expired entries and, over max_entries, the least
+    recently used ones.
+
+    Attributes:
+        path (str): The SQLite file.
+        max_entries (int): Most entries to keep.
+        ttl (float): Seconds an entry lives after it was last used.
+        evictions (int): Entries dropped so far by this process.
+    """
+
+    def __init__(self, path="sessions.sqlite3", max_entries=1000, ttl=3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # One connection shared by the server's threads (guarded by _lock)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS games ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS games_last_used ON games (last_used)")
+
+    def get(self, key):
+        """
+        Return the value stored under key, or None if it expired or was evicted.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM games WHERE key = ? AND last_used > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE games SET last_used = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        """
+        Store value under key, dropping expired and least recently used entries.
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO games (key, value, last_used) VALUES (?, ?, ?)",
+                (key, blob, now),
+            )
+            expired = self._db.execute(
+                "DELETE FROM games WHERE last_used <= ?", (now - self.ttl,)
+            ).rowcount
+            over_limit = self._db.execute(
+                "DELETE FROM games WHERE key IN ("
+                " SELECT key FROM games ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self.evictions += expired + over_limit
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM games WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+
+# name -> store class, for SANTA_SESSION_STORE
+SESSION_STORES = {"memory": MemoryStore, "sqlite": SQLiteStore}
+
+
+def make_store(kind, path="sessions.sqlite3", max_entries=1000, ttl=3600):
+    """
+    Create a session store by name.
+
+    Parameters:
+        kind (str): "memory" or "sqlite" ("" means no store)
+        path (str): SQLite file (only for "sqlite")
+        max_entries (int): Most entries to keep
+        ttl (float): Seconds an entry lives after it was last used
+
+    Returns:
+        MemoryStore, SQLiteStore or None
+    """
+    if not kind:
+        return None
+    if kind not in SESSION_STORES:
+        raise ValueError(f"Unknown session store {kind!r}; choose from {sorted(SESSION_STORES)}")
+    if kind == "sqlite":
+        return SQLiteStore(path, max_entries, ttl)
+    return MemoryStore(max_entries, ttl)
@@ -0,0 +1,294 @@
+"""
+Checks for the search engines and the other ways of finding a gift.
+
+Each one is compared with a plain, obviously correct loop over the same
+presents.
+
+Run them with: python -m pytest
+"""
+
+import json
+import random
+import re
+import shutil
+import subprocess
+
+import pytest
+
+import game_core
+import parallel_search
+import replay_export
+import search_engines  # noqa: F401 (registers the other engines)
+from file_search import search_file
+from game_core import linear_search, normalize_gift, presents_for_seed, virtual_presents
+
+WISHES = ["Bike", "lego  SET", "Book", "Kite"]
+
+
+def naive_find(presents, wish):
+    """
+    The first present that matches the wish, checking every present in turn.
+    """
+    for index, gift in enumerate(presents):
+        if normalize_gift(gift) == normalize_gift(wish):
+            return index
+    return -1
+
+
+def present_lists():
+    """
+    A few lists of every kind: short tuples and PresentLists with and without the wish.
+    """
+    lists = []
+    for seed in range(6):
+        lists.append(presents_for_seed(seed, 12, "Bike"))
+        lists.append(presents_for_seed(seed, 5000, "Bike"))
+        lists.append(presents_for_seed(seed, 5000, "Lego Set"))
+    return lists
+
+
+# --------------------------------------
+# Parallel chunked search
+# --------------------------------------
+
+@pytest.fixture
+def worker_processes(monkeypatch):
+    """
+    Make parallel_chunked_search use two worker processes even for short lists.
+    """
+    monkeypatch.setattr(parallel_search, "SEARCH_WORKERS", 2)
+    monkeypatch.setattr(parallel_search, "PARALLEL_MIN_PRESENTS", 0)
+    monkeypatch.setattr(parallel_search, "MIN_CHUNK_SIZE", 256)
+    monkeypatch.setattr(parallel_search, "_pool", None)
+    yield
+    if parallel_search._pool is not None:
+        parallel_search._pool.shutdown()
+
+
+@pytest.mark.parametrize("wish", WISHES)
+def test_linear_search_matches_naive_scan(wish):
+    for presents in present_lists():
+        assert linear_search(presents, wish).found_index == naive_find(presents, wish)
+
+
+@pytest.mark.parametrize("wish", WISHES)
+def test_parallel_search_in_process_matches_linear_search(monkeypatch, wish):
+    # Many small chunks, scanned one after another in this process
+    monkeypatch.setattr(parallel_search, "MIN_CHUNK_SIZE", 256)
+    for presents in present_lists():
+        run = parallel_search.parallel_chunked_search(presents, wish)
+        assert run.found_index == linear_search(presents, wish).found_index
+        assert len(run.probes) == len(linear_search(presents, wish).probes)
+
+
+def test_parallel_search_in_workers_matches_linear_search(worker_processes):
+    for wish in WISHES:
+        for presents in present_lists():
+            run = parallel_search.parallel_chunked_search(presents, wish)
+            assert run.found_index == linear_search(presents, wish).found_index
+    assert parallel_search._pool is not None
+
+
+def test_parallel_search_finds_first_of_many_matches(worker_processes):
+    # Matches in several chunks: the answer is still the first one
+    presents = ["Book"] * 3000
+    for index in (2900, 1500, 700):
+        presents[index] = "Bike"
+    run = parallel_search.parallel_chunked_search(presents, "bike")
+    assert run.found_index == 700
+
+
+def test_parallel_search_registered():
+    assert parallel_search.PARALLEL_SEARCH in game_core.SEARCH_ENGINES
+    trace = game_core.build_search_trace(list(presents_for_seed(1, 50, "Bike")), "Bike",
+                                         parallel_search.PARALLEL_SEARCH)
+    assert trace.found_index == naive_find(trace.layout, "Bike")
+
+
+def test_random_lists_with_repeats():
+    rng = random.Random(7)
+    for _ in range(20):
+        presents = [rng.choice(game_core.OTHER_GIFTS + ("Bike",)) for _ in range(rng.randint(1, 400))]
+        wish = rng.choice(("Bike", "book", "Kite"))
+        assert parallel_search.parallel_chunked_search(presents, wish).found_index \
+            == naive_find(presents, wish)
+
+
+# --------------------------------------
+# Searching a list file
+# --------------------------------------
+
+# Lines the random files are made of: the wish written in different ways,
+# near misses, and CSV fields with quotes and commas
+FILE_LINES = [
+    "Lego Set", "  lego   SET ", "Lego\tSet", "Lego Sets", "Lego", "Book", "Toy Car",
+    '"Lego Set"', '" Lego Set "', '"Lego, Set"', '"Book, used",Lego Set', "Lego Set,2",
+    "lego set , blue", "Book,Lego Set", "",
+]
+
+
+def naive_file_find(data, wish, csv):
+    """
+    Find the wish in a file's bytes the slow way: split it into lines and
+    compare each line (or its first CSV field) with the wish.
+
+    Returns:
+        (line_number, byte_offset, lines) with line_number 0 if not found
+    """
+    wanted = " ".join(wish.split()).casefold()
+    offset = 0
+    lines = data.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+    for number, line in enumerate(lines, 1):
+        text = line.decode("utf-8").removesuffix("\r").strip(" \t")
+        if csv and text.startswith('"') and '"' in text[1:]:
+            close = text.index('"', 1)
+            rest = text[close + 1:].lstrip(" \t")
+            field = text[1:close] if rest == "" or rest.startswith(",") else None
+        elif csv:
+            field = text.split(",")[0]
+        else:
+            field = text
+        if field is not None and " ".join(field.split()).casefold() == wanted:
+            return number, offset, len(lines)
+        offset += len(line) + 1
+    return 0, -1, len(lines)
+
+
+@pytest.mark.parametrize("suffix", [".txt", ".csv"])
+def test_file_search_matches_naive_parser(tmp_path, suffix):
+    rng = random.Random(suffix)
+    path = tmp_path / f"presents{suffix}"
+    for _ in range(300):
+        lines = [rng.choice(FILE_LINES) for _ in range(rng.randint(1, 12))]
+        newline = rng.choice(["\n", "\r\n"])
+        text = newline.join(lines) + rng.choice(["", newline])
+        path.write_bytes(text.encode("utf-8"))
+
+        result = search_file(path, "Lego Set")
+        line_number, byte_offset, total_lines = naive_file_find(
+            path.read_bytes(), "Lego Set", csv=suffix == ".csv"
+        )
+        assert (result.line_number, result.byte_offset) == (line_number, byte_offset), text
+        assert result.found == (line_number != 0)
+        assert result.lines_checked == (line_number or total_lines)
+
+
+def test_file_search_first_line_without_line_break(tmp_path):
+    path = tmp_path / "one.txt"
+    path.write_bytes(b"  LEGO set\r")
+    assert search_file(path, "Lego Set")[:4] == (True, 1, 0, 1)
+    path.write_bytes(b"Lego Sets")
+    assert search_file(path, "Lego Set")[:4] == (False, 0, -1, 1)
+
+
+# --------------------------------------
+# Jumping to a step
+# --------------------------------------
+
+def without_render_number(tree_html):
+    """
+    The tree HTML without its data-render number, which is new on every draw.
+    """
+    return re.sub(r' data-render="\d+"', "", tree_html)
+
+
+def jump_and_step_pairs(trace):
+    """
+    For every step k of the search: what k calls to step_search give, and
+    what jump_to_step(k) gives.
+
+    On short lists step_search only sends the changed boxes, so they are
+    applied to the starting boxes and the whole tree is drawn around them.
+    """
+    presents = list(trace.layout)
+    boxes = [game_core.render_present_box(gift, i, game_core.BOX_UNCHECKED)
+             for i, gift in enumerate(presents)]
+    search_index = -1
+    for step in range(1, trace.comparisons + 1):
+        status, patch, search_index, button = game_core.step_search(4, trace, presents, search_index)
+        if "boxes" in patch:
+            for index, box_html in patch["boxes"].items():
+                boxes[int(index)] = box_html
+            tree_html = game_core.wrap_tree("".join(boxes), game_core.layout_title(trace))
+        else:
+            tree_html = patch["tree"]
+        stepped = (status, without_render_number(tree_html), search_index, button)
+
+        status, patch, new_search_index, button = game_core.jump_to_step(4, trace, presents, step)
+        jumped = (status, without_render_number(patch["tree"]), new_search_index, button)
+        yield stepped, jumped
+
+
+@pytest.mark.parametrize("engine", sorted(game_core.SEARCH_ENGINES))
+@pytest.mark.parametrize("size", [9, game_core.TREE_WINDOW + 50])
+def test_jump_to_step_matches_stepping(engine, size):
+    for seed, wish in ((3, "Bike"), (4, "Kite")):
+        presents = list(presents_for_seed(seed, size, "Bike"))
+        trace = game_core.build_search_trace(presents, wish, engine)
+        for stepped, jumped in jump_and_step_pairs(trace):
+            assert jumped == stepped
+
+
+def test_jump_to_step_zero_is_the_start():
+    presents = list(presents_for_seed(2, 9, "Bike"))
+    trace = game_core.build_search_trace(presents, "Bike")
+    status, patch, search_index, button = game_core.jump_to_step(4, trace, presents, 0)
+    assert (status, search_index, button) == (game_core.ready_text(trace), -1, "Step")
+    assert "present unchecked" in patch["tree"] and "present checked" not in patch["tree"]
+
+
+# --------------------------------------
+# Virtual presents
+# --------------------------------------
+
+def test_splitmix64_known_answer():
+    # The first output of a SplitMix64 generator started at seed 0
+    assert game_core.splitmix64(0) == 0xE220A8397B1DCDAF
+
+
+def virtual_lists():
+    """
+    VirtualPresents with the wish placed, not placed, and equal to a pool gift.
+    """
+    lists = []
+    for seed in range(8):
+        for wish in ("Bike", "Book", "lego set"):
+            lists.append(virtual_presents(seed, 300, wish))
+    return lists
+
+
+@pytest.mark.parametrize("wish", WISHES + ["Toy  car", "Unicorn"])
+def test_virtual_find_matches_naive_scan(wish):
+    for presents in virtual_lists():
+        assert presents.find(wish) == naive_find(list(presents), wish)
+
+
+def test_virtual_slices_match_list_slices():
+    rng = random.Random(21)
+    for presents in virtual_lists():
+        everything = list(presents)
+        for _ in range(10):
+            start, stop = rng.randint(-320, 320), rng.randint(-320, 320)
+            step = rng.choice([1, 2, 3, 7, -1, -4])
+            part = presents[start:stop:step]
+            assert isinstance(part, game_core.VirtualPresents)
+            assert list(part) == everything[start:stop:step]
+            for wish in ("Bike", "Book", "Unicorn"):
+                assert part.find(wish) == naive_find(everything[start:stop:step], wish)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run the replay player")
+def test_replay_player_computes_the_same_presents():
+    # The player's code for VirtualPresents, run on the JSON the export writes
+    player = replay_export.REPLAY_PLAYER_JS
+    start = player.index("const v = data.virtual")
+    gift_at = player[start:player.index("} else {", start)]
+    for presents in (virtual_presents(5, 200, "Bike"), virtual_presents(6, 10**9, "Kite")[7::3]):
+        data = "".join(replay_export.presents_json_chunks(presents))
+        script = (f"const data = {{{data}}};\nlet giftAt;\n{gift_at}\n"
+                  f"console.log(JSON.stringify(Array.from({{length: 200}}, (_, i) => giftAt(i))));")
+        output = subprocess.run(["node", "-e", script], capture_output=True, text=True,
+                                check=True).stdout
+        assert json.loads(output) == list(presents[:200])